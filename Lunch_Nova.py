@@ -5,9 +5,8 @@ import threading
 import time
 import os
 import random
-import requests
-from bs4 import BeautifulSoup
 from pathlib import Path
+import nova_facts
 
 # === CONFIG ===
 SILENT_TIMEOUT = 20  # seconds of silence before random topic
@@ -18,7 +17,8 @@ VB_CABLE_DEVICE_NAME = "CABLE Input (VB-Audio Virtual Cable)"
 recognizer = sr.Recognizer()
 tts = pyttsx3.init()
 voices = tts.getProperty('voices')
-facts = []
+fact_fetcher = nova_facts.FactFetcher()
+facts = fact_fetcher.cached_facts()  # last run's facts, so there is something to say before the first refresh
 last_spoken_time = time.time()
 
 # Set VB-Cable as output device for TTS
@@ -43,30 +43,6 @@ def get_random_fact():
         return "I couldn't find anything weird. Maybe check your connection?"
     return random.choice(facts)
 
-# Scrape Ripley's weird facts
-def scrape_ripleys():
-    try:
-        url = "https://www.ripleys.com/weird-news/"
-        res = requests.get(url)
-        soup = BeautifulSoup(res.text, 'html.parser')
-        articles = soup.find_all("h3", class_="entry-title")
-        return [a.get_text(strip=True) for a in articles[:10]]
-    except Exception as e:
-        print("Ripley's scrape error:", e)
-        return []
-
-# Scrape Ancient Aliens episode titles
-def scrape_aliens():
-    try:
-        url = "https://www.history.com/shows/ancient-aliens/season-1"
-        res = requests.get(url)
-        soup = BeautifulSoup(res.text, 'html.parser')
-        titles = soup.find_all("h3", class_="episode-title")
-        return [t.get_text(strip=True) for t in titles[:10]]
-    except Exception as e:
-        print("Ancient Aliens scrape error:", e)
-        return []
-
 # Background: Monitor silence
 def silence_monitor():
     while True:
@@ -79,7 +55,7 @@ def silence_monitor():
 def refresh_facts():
     global facts
     while True:
-        new_facts = scrape_ripleys() + scrape_aliens()
+        new_facts = fact_fetcher.refresh()
         if new_facts:
             facts = new_facts
         time.sleep(FACT_REFRESH)
@@ -1,3 +1,29 @@
+import argparse
+import concurrent.futures
+import http.client
+import http.server
+import json
+import os
+import queue
+import random
+import re
+import sqlite3
+import threading
+import time
+
+import nova_learning
+import nova_matcher
+
+HOST = "127.0.0.1"
+PORT = 8765
+MEMORY_FILE = "nova_memory.json"
+PERSONALITY_FILE = "nova_personality.json"
+REQUEST_LOG = "requests.jsonl"
+BATCH_WINDOW_MS = 5   # how long the first request of a batch waits for company
+MAX_BATCH = 32
+RELOAD_CHECK_S = 1.0  # how often a worker looks for newly taught triggers / learned replies
+
+# Used when nova_personality.json is missing or lacks a category.
 responses = {
     "default": [
         "Hmm... curious, Captain.",
@@ -13,3 +39,510 @@ responses = {
         "You wanna hear something *wild*?"
     ]
 }
+
+_GREETING = re.compile(r"\b(hello|hi|hey|good (morning|evening)|welcome back)\b")
+_FACT = re.compile(r"\b(fact|facts|something (weird|wild|freaky))\b")
+
+
+def load_personality(path=PERSONALITY_FILE):
+    personality = {k: list(v) for k, v in responses.items()}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            personality.update({k: v for k, v in json.load(f).items() if v})
+    except (OSError, ValueError) as e:
+        print("Using built-in personality:", e)
+    return personality
+
+
+def read_journal(path, offset=0, seen=0):
+    """Complete journal records past byte offset with a seq above seen, and the offset after them.
+
+    Nova may be appending as we read: a torn or half-written last line is
+    left where it is for the next call.
+    """
+    records = []
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                offset += len(line)
+                if record["seq"] > seen:
+                    records.append(record)
+    except OSError:
+        pass
+    return records, offset
+
+
+def load_triggers(path=MEMORY_FILE):
+    """Taught triggers and aliases from the memory snapshot plus its journal, read-only.
+
+    Nova may be running and writing the same files, so nothing is truncated
+    or compacted here. Also returns how far into the journal that got (byte
+    offset and last seq), so later records can be read on their own.
+    """
+    memory = {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            memory = json.load(f)
+    except (OSError, ValueError) as e:
+        print("No memory snapshot for the server:", e)
+    custom = dict(memory.get("custom_responses", {}))
+    aliases = dict(memory.get("trigger_aliases", {}))
+    seq = memory.get("_journal_seq", 0)
+    records, offset = read_journal(path + ".journal", 0, seq)
+    for record in records:
+        seq = record["seq"]
+        if record["op"] == "delete" and record["key"] == "trigger_aliases":
+            aliases.pop(record["field"], None)
+        elif record["op"] != "set":
+            continue
+        elif record["key"] == "custom_responses":
+            custom[record["field"]] = record["value"]
+        elif record["key"] == "trigger_aliases":
+            aliases[record["field"]] = record["value"]
+    return custom, aliases, offset, seq
+
+
+def load_learned_index(db_path=nova_learning.LIVE_DB):
+    """A StatementIndex straight from the learning engine's SQLite file, without starting ChatBot."""
+    index = nova_learning.StatementIndex()
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        for text, in_response_to in connection.execute("SELECT text, in_response_to FROM statement"):
+            index.add(text, in_response_to)
+    finally:
+        connection.close()
+    return index
+
+
+# --- worker processes ------------------------------------------------------
+
+_worker = None
+_rebuilding = None  # background thread building a replacement for _worker
+_rebuilt = None     # what it built, swapped in by the request thread
+
+
+def _source_stats(memory_path, use_learning):
+    """What a full rebuild depends on: the snapshot and learned DB as (mtime, size), None if missing.
+
+    The journal is not in here; it is followed incrementally instead.
+    """
+    paths = [memory_path]
+    if use_learning:
+        paths.append(nova_learning.LIVE_DB)
+    stats = []
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            stats.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            stats.append(None)
+    return stats
+
+
+def _build_worker(memory_path, personality_path, use_learning, extra_triggers):
+    sources = _source_stats(memory_path, use_learning)
+    custom, aliases, journal_offset, seq = load_triggers(memory_path)
+    for i in range(extra_triggers):
+        # Synthetic load for --loadgen: makes matching cost what a big taught set would.
+        custom[f"synthetic trigger {i} w{i % 97} w{i % 89}"] = f"synthetic reply {i}"
+    trigger_index = nova_matcher.TriggerIndex(custom)
+    for alias, trigger in aliases.items():
+        if trigger in custom:
+            trigger_index.add(alias, custom[trigger])
+    trigger_index.match("")  # links the automaton here rather than on the first request
+    learned = None
+    if use_learning:
+        try:
+            learned = load_learned_index()
+        except Exception as e:
+            print("Learned responses unavailable in worker:", e)
+    return {
+        "triggers": trigger_index,
+        "recent": nova_matcher.TriggerIndex(),  # taught since the build; small, so cheap to relink
+        "fuzzy": nova_matcher.FuzzyTriggerIndex(custom),
+        "custom": custom,
+        "aliases": aliases,
+        "learned": learned,
+        "personality": load_personality(personality_path),
+        "random": random.Random(),
+        "config": (memory_path, personality_path, use_learning, extra_triggers),
+        "sources": sources,
+        "journal_offset": journal_offset,
+        "seq": seq,
+        "stale": False,
+        "checked": time.monotonic(),
+    }
+
+
+def _init_worker(memory_path, personality_path, use_learning, extra_triggers):
+    global _worker
+    _worker = _build_worker(memory_path, personality_path, use_learning, extra_triggers)
+
+
+def _rebuild(config):
+    global _rebuilt
+    try:
+        _rebuilt = _build_worker(*config)
+    except Exception as e:
+        print("Worker rebuild failed:", e)
+
+
+def _apply_journal(records):
+    """Fold newly taught triggers and aliases into the live indexes; every other record is skipped.
+
+    Exact triggers go into the small "recent" automaton: adding to the big
+    one would relink all of it on the next match. Returns True when a
+    forgotten alias means the indexes have to be rebuilt instead.
+    """
+    custom, aliases = _worker["custom"], _worker["aliases"]
+    for record in records:
+        if record["op"] == "delete" and record["key"] == "trigger_aliases":
+            return True
+        _worker["seq"] = record["seq"]
+        if record["op"] != "set":
+            continue
+        field, value = record["field"], record["value"]
+        if record["key"] == "custom_responses":
+            custom[field] = value
+            _worker["recent"].add(field, value)
+            _worker["fuzzy"].add(field, value)
+            for alias, trigger in aliases.items():
+                if trigger == field:
+                    _worker["recent"].add(alias, value)
+        elif record["key"] == "trigger_aliases":
+            aliases[field] = value
+            if value in custom:
+                _worker["recent"].add(field, custom[value])
+
+
+def _reload_if_changed():
+    """Keep this worker's indexes up to date with what Nova has taught or learned.
+
+    New journal records are read from where the last read stopped and
+    applied in place, so a turn Nova merely heard costs a few bytes of I/O.
+    A new snapshot (Nova compacted, restarting the journal), a changed
+    learned DB or a forgotten alias needs everything rebuilt; that happens
+    on a background thread while the old indexes keep answering, and is
+    swapped in when done.
+    """
+    global _worker, _rebuilding, _rebuilt
+    if _rebuilding is not None and not _rebuilding.is_alive():
+        if _rebuilt is not None:
+            _worker = _rebuilt
+        _rebuilding = _rebuilt = None
+    if time.monotonic() - _worker["checked"] < RELOAD_CHECK_S:
+        return
+    _worker["checked"] = time.monotonic()
+    if _rebuilding is not None:
+        return  # the journal may have been restarted under us; the rebuild picks it up
+    memory_path, _, use_learning, _ = _worker["config"]
+    journal_path = memory_path + ".journal"
+    try:
+        journal_size = os.path.getsize(journal_path)
+    except OSError:
+        journal_size = 0
+    restarted = journal_size < _worker["journal_offset"]
+    if journal_size > _worker["journal_offset"] and not _worker["stale"]:
+        records, _worker["journal_offset"] = read_journal(journal_path, _worker["journal_offset"], _worker["seq"])
+        _worker["stale"] = _apply_journal(records)
+    if restarted or _worker["stale"] or _source_stats(memory_path, use_learning) != _worker["sources"]:
+        _rebuilding = threading.Thread(target=_rebuild, args=(_worker["config"],), daemon=True)
+        _rebuilding.start()
+
+
+def _match_trigger(lowered):
+    """TriggerIndex.match over the built and the recently taught triggers together; recent wins ties."""
+    match = _worker["triggers"].match(lowered)
+    recent = _worker["recent"].match(lowered) if len(_worker["recent"]) else None
+    if recent is None:
+        return match
+    if match is None or len(recent[0]) > len(match[0]) or (
+            len(recent[0]) == len(match[0]) and lowered.find(recent[0]) <= lowered.find(match[0])):
+        return recent
+    return match
+
+
+def _respond(text):
+    lowered = text.lower()
+    match = _match_trigger(lowered)
+    if match is not None:
+        return {"reply": match[1], "source": "trigger", "trigger": match[0]}
+    near = _worker["fuzzy"].best(lowered)
+    if near is not None:
+        return {"reply": near[1], "source": "fuzzy", "trigger": near[0], "score": round(near[2], 3)}
+    if _worker["learned"] is not None:
+        hit = _worker["learned"].respond(text)
+        if hit is not None:
+            return {"reply": hit[0], "source": "learned", "score": round(hit[1], 3)}
+    if _GREETING.search(lowered):
+        persona = "greeting"
+    elif _FACT.search(lowered):
+        persona = "weird_fact_intro"
+    else:
+        persona = "default"
+    lines = _worker["personality"].get(persona) or responses[persona]
+    return {"reply": _worker["random"].choice(lines), "source": "persona", "persona": persona}
+
+
+def respond_batch(texts):
+    """Runs in a worker process: one reply dict per text, in order. Repeats within a batch are answered once."""
+    _reload_if_changed()
+    answered = {}
+    for text in texts:
+        if text not in answered:
+            answered[text] = _respond(text)
+    return [answered[text] for text in texts]
+
+
+# --- server process --------------------------------------------------------
+
+class MicroBatcher:
+    """Groups requests that arrive within window seconds into one worker call.
+
+    Batches are dispatched as soon as they close, up to max_in_flight at a
+    time, so a slow batch on one core does not hold up the others.
+    """
+
+    def __init__(self, executor, window=BATCH_WINDOW_MS / 1000, max_batch=MAX_BATCH, max_in_flight=4):
+        self.executor = executor
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self.batches = 0
+        self.requests = 0
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def submit(self, text):
+        future = concurrent.futures.Future()
+        self._queue.put((text, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._slots.acquire()
+            self.batches += 1
+            self.requests += len(batch)
+            try:
+                work = self.executor.submit(respond_batch, [text for text, _ in batch])
+            except Exception as e:
+                self._slots.release()
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+            work.add_done_callback(lambda done, batch=batch: self._finish(done, batch))
+
+    def _finish(self, done, batch):
+        self._slots.release()
+        try:
+            results = done.result()
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            future.set_result(dict(result, batch=len(batch)))
+
+
+class RequestLog:
+    """Appends one JSON line per request from a background thread."""
+
+    def __init__(self, path=REQUEST_LOG):
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a", encoding="utf-8")
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def write(self, entry):
+        self._queue.put(entry)
+
+    def _run(self):
+        while True:
+            entries = [self._queue.get()]
+            while True:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._file.write("".join(json.dumps(e) + "\n" for e in entries))
+            self._file.flush()
+
+
+class ResponseHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so each front-end reuses one connection
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"ok": True})
+        elif self.path == "/stats":
+            batcher = self.server.batcher
+            self._send_json(200, {"requests": batcher.requests, "batches": batcher.batches,
+                                  "mean_batch": batcher.requests / batcher.batches if batcher.batches else 0.0})
+        else:
+            self._send_json(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/respond":
+            self._send_json(404, {"error": "not found"})
+            return
+        started = time.perf_counter()
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            text = str(request["text"])
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"expected JSON with a 'text' field: {e}"})
+            return
+        try:
+            result = self.server.batcher.submit(text).result(timeout=10)
+        except Exception as e:
+            self._send_json(500, {"error": str(e)})
+            return
+        result["ms"] = round((time.perf_counter() - started) * 1000, 3)
+        self._send_json(200, result)
+        if self.server.request_log is not None:
+            self.server.request_log.write(dict(result, ts=time.time(), text=text,
+                                               client=request.get("client", self.client_address[0])))
+
+    def log_message(self, format, *args):
+        pass  # one line per request would swamp the console; see the request log instead
+
+
+def make_server(host=HOST, port=PORT, workers=None, memory_path=MEMORY_FILE,
+                personality_path=PERSONALITY_FILE, log_path=REQUEST_LOG, use_learning=False,
+                batch_window_ms=BATCH_WINDOW_MS, max_batch=MAX_BATCH, extra_triggers=0):
+    workers = workers or os.cpu_count() or 1
+    executor = concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker,
+        initargs=(memory_path, personality_path, use_learning, extra_triggers))
+    server = http.server.ThreadingHTTPServer((host, port), ResponseHandler)
+    server.daemon_threads = True
+    server.executor = executor
+    server.workers = workers
+    server.batcher = MicroBatcher(executor, batch_window_ms / 1000, max_batch, max_in_flight=workers * 2)
+    server.request_log = RequestLog(log_path) if log_path else None
+    # Start every worker now so the first requests don't pay for process start-up and index builds.
+    list(executor.map(respond_batch, [["hello"]] * workers))
+    return server
+
+
+# --- load generator --------------------------------------------------------
+
+LOAD_TEXTS = ["hello nova", "what is your name", "tell me a weird fact",
+              "synthetic trigger 42 w42 w42", "synthetik triger 7 w7 w7", "how do rockets work"]
+
+
+def run_load(host, port, clients=16, total=2000):
+    """Fire total requests from clients keep-alive connections; returns throughput and latency."""
+    per_client = total // clients
+    latencies = []
+    lock = threading.Lock()
+
+    def client(n):
+        connection = http.client.HTTPConnection(host, port)
+        mine = []
+        for i in range(per_client):
+            body = json.dumps({"text": LOAD_TEXTS[(n + i) % len(LOAD_TEXTS)], "client": f"load-{n}"})
+            started = time.perf_counter()
+            connection.request("POST", "/respond", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            response.read()
+            mine.append((time.perf_counter() - started) * 1000)
+        connection.close()
+        with lock:
+            latencies.extend(mine)
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {"requests": len(latencies), "seconds": round(elapsed, 3),
+            "per_second": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(latencies[len(latencies) // 2], 3),
+            "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 3)}
+
+
+def loadgen(args):
+    if args.url:
+        host, _, port = args.url.replace("http://", "").partition(":")
+        print(json.dumps(run_load(host, int(port or PORT), args.clients, args.requests)))
+        return
+    # No server given: start one per worker count and show how throughput scales with cores.
+    counts = sorted({1, 2, 4, os.cpu_count() or 1} & set(range(1, (os.cpu_count() or 1) + 1)))
+    for workers in counts:
+        server = make_server(HOST, 0, workers=workers, memory_path=args.memory,
+                             personality_path=args.personality, log_path=args.log,
+                             use_learning=args.learning, batch_window_ms=args.batch_window_ms,
+                             max_batch=args.max_batch, extra_triggers=args.extra_triggers)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        result = run_load(HOST, server.server_port, args.clients, args.requests)
+        batcher = server.batcher
+        result.update(workers=workers, mean_batch=round(batcher.requests / max(1, batcher.batches), 2))
+        print(json.dumps(result))
+        server.shutdown()
+        server.server_close()
+        server.executor.shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nova response server for local front-ends.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per core)")
+    parser.add_argument("--batch-window-ms", type=float, default=BATCH_WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--memory", default=MEMORY_FILE)
+    parser.add_argument("--personality", default=PERSONALITY_FILE)
+    parser.add_argument("--log", default=REQUEST_LOG, help="request log (JSONL); empty to disable")
+    parser.add_argument("--learning", action="store_true", help="also answer from the learned responses")
+    parser.add_argument("--loadgen", action="store_true", help="run the load generator instead of serving")
+    parser.add_argument("--url", help="with --loadgen: an already running server, e.g. 127.0.0.1:8765")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--extra-triggers", type=int, default=0, help="synthetic triggers to load the matcher")
+    args = parser.parse_args(argv)
+    if args.loadgen:
+        loadgen(args)
+        return
+    server = make_server(args.host, args.port, args.workers, args.memory, args.personality,
+                         args.log, args.learning, args.batch_window_ms, args.max_batch, args.extra_triggers)
+    print(f"🧠 Nova response server on http://{args.host}:{server.server_port} "
+          f"({server.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
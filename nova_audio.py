@@ -0,0 +1,498 @@
+import collections
+import io
+import json
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+import simpleaudio as sa
+import sounddevice as sd
+import speech_recognition as sr
+
+from nova_resample import PolyphaseResampler
+
+SAMPLE_RATE = 16000  # What the recognizer wants
+FRAME_MS = 30        # VAD decision granularity
+
+# Proof that a conversational turn stays in RAM: anything that touches disk
+# for audio bumps "disk_reads"/"disk_writes", the in-memory paths bump the rest.
+io_stats = collections.Counter()
+
+# Set to a nova_echo.PlaybackReference to let the echo canceller see what is being played.
+playback_reference = None
+
+
+def to_audio_data(samples, sample_rate=SAMPLE_RATE):
+    """Wrap captured int16 mono samples for speech_recognition without a WAV file."""
+    io_stats["mem_captures"] += 1
+    return sr.AudioData(np.ascontiguousarray(samples, dtype=np.int16).tobytes(), sample_rate, 2)
+
+
+def split_wav_bytes(wav_bytes):
+    """Return (pcm, channels, sample_width, sample_rate) from an in-memory WAV blob."""
+    with wave.open(io.BytesIO(wav_bytes), "rb") as w:
+        return w.readframes(w.getnframes()), w.getnchannels(), w.getsampwidth(), w.getframerate()
+
+
+def amplitude_envelope(pcm, sample_rate=SAMPLE_RATE, frame_rate=30):
+    """Per-video-frame loudness of 16-bit mono PCM, normalized to 0..1."""
+    samples = np.frombuffer(pcm, dtype=np.int16)
+    hop = max(1, sample_rate // frame_rate)
+    n = len(samples) // hop
+    if n == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = samples[:n * hop].reshape(n, hop).astype(np.float32)
+    rms = np.sqrt(np.mean(frames * frames, axis=1))
+    peak = np.percentile(rms, 95)
+    if peak <= 0:
+        return np.zeros(n, dtype=np.float32)
+    return np.clip(rms / peak, 0.0, 1.0).astype(np.float32)
+
+
+def play_pcm(pcm, channels=1, sample_width=2, sample_rate=SAMPLE_RATE):
+    """Play raw PCM straight from memory; returns the simpleaudio PlayObject."""
+    io_stats["mem_playbacks"] += 1
+    play_obj = sa.play_buffer(pcm, channels, sample_width, sample_rate)
+    if playback_reference is not None and channels == 1 and sample_width == 2:
+        playback_reference.add(pcm, sample_rate, time.monotonic())
+    return play_obj
+
+
+def playback_stopped():
+    """Playback was cut short; the echo reference must not keep expecting the rest of it."""
+    if playback_reference is not None:
+        playback_reference.stop()
+
+
+# Inputs that carry system audio or other apps rather than a microphone.
+VIRTUAL_INPUT_NAMES = ("cable", "virtual", "stereo mix", "loopback", "monitor of", "what u hear", "voicemeeter")
+# Host APIs that hand over the device's own stream rather than a resampled/shared one.
+HOSTAPI_SCORES = {"Windows WASAPI": 6, "Core Audio": 6, "ALSA": 4, "Windows DirectSound": 3,
+                  "JACK Audio Connection Kit": 2, "MME": 1}
+
+
+class DeviceCatalog:
+    """Input devices, probed once at their native rate and scored, cached on disk.
+
+    The cache is keyed on a fingerprint of what PortAudio reports, default
+    input included, so a plugged or unplugged device or a new system default
+    triggers a fresh probe and an unchanged system reuses the previous
+    ranking without opening anything.
+    """
+
+    def __init__(self, cache_path=None, max_channels=2):
+        self.cache_path = cache_path
+        self.max_channels = max_channels  # anything beyond stereo is only going to be downmixed
+
+    @staticmethod
+    def _fingerprint(devices, default_index):
+        default_name = devices[default_index]["name"] if 0 <= default_index < len(devices) else None
+        return {"default": [default_index, default_name],
+                "devices": [[d["name"], d["hostapi"], d["max_input_channels"], d["default_samplerate"]]
+                            for d in devices]}
+
+    def _load(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except Exception as e:
+            print("Failed to load device cache:", e)
+            return None
+
+    def _save(self, state):
+        if not self.cache_path:
+            return
+        try:
+            with open(self.cache_path, "w") as f:
+                json.dump(state, f, indent=2)
+        except Exception as e:
+            print("Failed to save device cache:", e)
+
+    def probe(self, index, info, default_name=None):
+        """Capabilities and score of one input device, or None if it will not open as reported."""
+        rate = int(info["default_samplerate"])
+        channels = min(info["max_input_channels"], self.max_channels)
+        try:
+            sd.check_input_settings(device=index, samplerate=rate, channels=channels, dtype="int16")
+        except Exception:
+            return None
+        hostapi = sd.query_hostapis(info["hostapi"])["name"]
+        score = HOSTAPI_SCORES.get(hostapi, 0)
+        # The same microphone shows up once per host API (MME cuts names at 31 characters);
+        # the default counts wherever it appears, so the better API's copy of it wins.
+        if default_name and info["name"][:31] == default_name[:31]:
+            score += 20
+        if any(word in info["name"].lower() for word in VIRTUAL_INPUT_NAMES):
+            score -= 100
+        if rate % SAMPLE_RATE == 0:
+            score += 2  # integer decimation, the cheapest resampling ratio
+        return {"index": index, "name": info["name"], "hostapi": hostapi,
+                "sample_rate": rate, "channels": channels, "score": score}
+
+    def scan(self):
+        devices = sd.query_devices()
+        default_index = sd.default.device[0]
+        fingerprint = self._fingerprint(devices, default_index)
+        cached = self._load()
+        if cached and cached.get("fingerprint") == fingerprint:
+            return cached["inputs"]
+        default_name = fingerprint["default"][1]
+        inputs = []
+        for i, info in enumerate(devices):
+            if info["max_input_channels"] > 0:
+                entry = self.probe(i, info, default_name)
+                if entry is not None:
+                    inputs.append(entry)
+        inputs.sort(key=lambda entry: entry["score"], reverse=True)
+        self._save({"fingerprint": fingerprint, "inputs": inputs, "updated": time.time()})
+        return inputs
+
+
+def open_microphone(devices, **mic_options):
+    """A started MicStream on the first of devices (best first, as scan() returns them) that opens.
+
+    A device can pass the probe and still fail to open, e.g. when another
+    program holds it exclusively; the next candidate is tried instead.
+    """
+    if not devices:
+        raise RuntimeError("❌ No valid input devices found.")
+    for device in devices:
+        print(f"✅ Using microphone [{device['index']}] {device['name']} ({device['hostapi']}, "
+              f"{device['sample_rate']} Hz x{device['channels']})")
+        mic = MicStream(device=device["index"], device_rate=device["sample_rate"],
+                        channels=device["channels"], **mic_options)
+        try:
+            mic.start()
+            return mic
+        except RuntimeError:
+            print("⚠️ Trying the next input device.")
+    raise RuntimeError("❌ Could not access microphone. Check your sound box or input config.")
+
+
+class AudioRingBuffer:
+    """Fixed-size int16 ring fed by the PortAudio callback and drained by the listen thread."""
+
+    def __init__(self, capacity):
+        self._buf = np.zeros(capacity, dtype=np.int16)
+        self._capacity = capacity
+        self._written = 0  # total samples ever written
+        self._read = 0     # total samples ever read
+        self.last_read_start = 0  # absolute index of the first sample returned by the last read()
+        self._closed = False
+        self._cond = threading.Condition()
+        self.overruns = 0
+
+    def write(self, samples):
+        n = len(samples)
+        if n == 0:
+            return
+        if n > self._capacity:
+            samples = samples[-self._capacity:]
+            n = self._capacity
+        with self._cond:
+            start = self._written % self._capacity
+            end = start + n
+            if end <= self._capacity:
+                self._buf[start:end] = samples
+            else:
+                split = self._capacity - start
+                self._buf[start:] = samples[:split]
+                self._buf[:end - self._capacity] = samples[split:]
+            self._written += n
+            if self._written - self._read > self._capacity:
+                # Reader fell behind; drop the oldest audio rather than block the callback.
+                self.overruns += 1
+                self._read = self._written - self._capacity
+            self._cond.notify()
+
+    def read(self, n, timeout=None):
+        with self._cond:
+            ready = self._cond.wait_for(
+                lambda: self._closed or self._written - self._read >= n, timeout)
+            if not ready or self._written - self._read < n:
+                return None
+            start = self._read % self._capacity
+            end = start + n
+            if end <= self._capacity:
+                out = self._buf[start:end].copy()
+            else:
+                out = np.concatenate((self._buf[start:], self._buf[:end - self._capacity]))
+            self.last_read_start = self._read
+            self._read += n
+            return out
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class VoiceActivityDetector:
+    """Per-frame speech/non-speech decision from RMS energy and zero-crossing rate."""
+
+    def __init__(self, energy_threshold=300.0, max_zero_crossing_rate=0.35):
+        self.energy_threshold = energy_threshold
+        # Broadband hiss crosses zero far more often than voiced speech does.
+        self.max_zero_crossing_rate = max_zero_crossing_rate
+
+    @staticmethod
+    def frame_stats(frame):
+        samples = frame.astype(np.float32)
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        zcr = float(np.count_nonzero(np.diff(np.signbit(frame)))) / max(len(frame) - 1, 1)
+        return rms, zcr
+
+    def classify(self, frame):
+        """Return (is_speech, rms) so callers can reuse the energy figure."""
+        rms, zcr = self.frame_stats(frame)
+        return rms >= self.energy_threshold and zcr <= self.max_zero_crossing_rate, rms
+
+    def is_speech(self, frame):
+        return self.classify(frame)[0]
+
+
+class NoiseFloorModel:
+    """Running noise-floor estimate from the RMS of non-speech frames, persisted across restarts.
+
+    Non-speech frame energies are batched; each batch contributes its upper
+    percentile to an exponentially weighted floor, and the speech threshold
+    is a fixed multiple of that floor.
+    """
+
+    def __init__(self, state_path=None, percentile=90, smoothing=0.8, multiplier=3.0,
+                 min_threshold=150.0, initial_floor=100.0, batch_frames=33, save_interval=60):
+        self.state_path = state_path
+        self.percentile = percentile
+        self.smoothing = smoothing
+        self.multiplier = multiplier
+        self.min_threshold = min_threshold
+        self.floor = initial_floor
+        self.batch_frames = batch_frames
+        self.save_interval = save_interval
+        self._pending = np.empty(batch_frames, dtype=np.float32)
+        self._count = 0
+        self._last_saved = 0.0
+        self._lock = threading.Lock()
+        self.load()
+
+    @property
+    def threshold(self):
+        return max(self.min_threshold, self.floor * self.multiplier)
+
+    def observe(self, rms):
+        """Record the energy of one non-speech frame."""
+        with self._lock:
+            self._pending[self._count] = rms
+            self._count += 1
+            if self._count < self.batch_frames:
+                return
+            batch_level = float(np.percentile(self._pending, self.percentile))
+            self.floor = self.smoothing * self.floor + (1 - self.smoothing) * batch_level
+            self._count = 0
+        if time.time() - self._last_saved >= self.save_interval:
+            self.save()
+
+    def load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r") as f:
+                self.floor = float(json.load(f)["noise_floor"])
+            print(f"Noise floor restored: {self.floor:.1f} (threshold {self.threshold:.1f})")
+        except Exception as e:
+            print("Failed to load noise floor:", e)
+
+    def save(self):
+        self._last_saved = time.time()
+        if not self.state_path:
+            return
+        try:
+            with open(self.state_path, "w") as f:
+                json.dump({"noise_floor": self.floor, "threshold": self.threshold,
+                           "updated": self._last_saved}, f, indent=2)
+        except Exception as e:
+            print("Failed to save noise floor:", e)
+
+
+class UtteranceSegmenter:
+    """Turns a continuous frame stream into utterances, ending each one on trailing silence."""
+
+    def __init__(self, vad=None, noise_model=None, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS,
+                 pre_roll_ms=300, hangover_ms=400, start_ms=90, max_utterance_s=15):
+        self.vad = vad or VoiceActivityDetector()
+        self.noise_model = noise_model
+        if noise_model is not None:
+            self.vad.energy_threshold = noise_model.threshold
+        self.sample_rate = sample_rate
+        self.frame_ms = frame_ms
+        self._pre_roll = collections.deque(maxlen=max(1, pre_roll_ms // frame_ms))
+        self._hangover_frames = max(1, hangover_ms // frame_ms)
+        self._start_frames = max(1, start_ms // frame_ms)
+        self._max_frames = int(max_utterance_s * 1000 // frame_ms)
+        self._frames = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        self.onset_frames = 0  # frames replayed through on_speech when the current utterance began
+
+    @property
+    def in_speech(self):
+        return self._in_speech
+
+    def process(self, frame, on_speech=None):
+        """Feed one frame; returns the finished utterance as int16 samples, else None.
+
+        on_speech(frame) is called for every frame that ends up in an utterance
+        (the pre-roll included) as soon as it is known to, so a streaming
+        recognizer can decode while the user is still talking. The first
+        onset_frames of those calls are the replayed pre-roll, delivered at once.
+        """
+        speech, rms = self.vad.classify(frame)
+        if not self._in_speech:
+            if not speech and self.noise_model is not None:
+                self.noise_model.observe(rms)
+                self.vad.energy_threshold = self.noise_model.threshold
+            self._pre_roll.append(frame)
+            self._speech_run = self._speech_run + 1 if speech else 0
+            if self._speech_run >= self._start_frames:
+                self._in_speech = True
+                self._frames = list(self._pre_roll)
+                self.onset_frames = len(self._frames)
+                self._pre_roll.clear()
+                self._silence_run = 0
+                if on_speech is not None:
+                    for onset_frame in self._frames:
+                        on_speech(onset_frame)
+            return None
+
+        self._frames.append(frame)
+        if on_speech is not None:
+            on_speech(frame)
+        self._silence_run = 0 if speech else self._silence_run + 1
+        if self._silence_run >= self._hangover_frames or len(self._frames) >= self._max_frames:
+            return self._emit()
+        return None
+
+    def _emit(self):
+        utterance = np.concatenate(self._frames)
+        self._frames = []
+        self._in_speech = False
+        self._speech_run = 0
+        self._silence_run = 0
+        return utterance
+
+
+class MicStream:
+    """One long-lived callback input stream; utterances come out as soon as the speaker stops.
+
+    The device is opened at device_rate with channels channels (its native
+    format, see DeviceCatalog) and the callback downmixes and resamples to
+    sample_rate mono, so PortAudio never has to convert.
+    """
+
+    def __init__(self, device=None, sample_rate=SAMPLE_RATE, frame_ms=FRAME_MS,
+                 segmenter=None, buffer_seconds=10, echo_canceller=None,
+                 device_rate=None, channels=1, **segmenter_options):
+        self.device = device
+        self.sample_rate = sample_rate
+        self.frame_samples = sample_rate * frame_ms // 1000
+        self.device_rate = device_rate or sample_rate
+        self.channels = channels
+        self.frame_ms = frame_ms
+        self.resampler = None
+        if self.device_rate != sample_rate or channels != 1:
+            self.resampler = PolyphaseResampler(self.device_rate, sample_rate, channels)
+        self.segmenter = segmenter or UtteranceSegmenter(
+            sample_rate=sample_rate, frame_ms=frame_ms, **segmenter_options)
+        self._ring = AudioRingBuffer(sample_rate * buffer_seconds)
+        self._stream = None
+        self.status_errors = 0
+        self.echo_canceller = echo_canceller
+        self._anchor = None  # (monotonic time, ring index) of one captured sample
+
+    def _mark_capture(self, captured_at, index):
+        """Tie ring index to a monotonic capture time; only re-anchor when the clocks drift apart."""
+        if self._anchor is None or abs(self.sample_time(index) - captured_at) > 0.02:
+            self._anchor = (captured_at, index)
+
+    def sample_time(self, index):
+        """Monotonic time at which the sample at absolute ring index was captured."""
+        anchor_time, anchor_index = self._anchor
+        return anchor_time + (index - anchor_index) / self.sample_rate
+
+    def _callback(self, indata, frames, time_info, status):
+        if status:
+            self.status_errors += 1
+        samples = indata[:, 0] if self.resampler is None else self.resampler.process(indata)
+        if self.echo_canceller is not None and len(samples):
+            # How long ago the ADC took the first sample of this block, per PortAudio's own clock.
+            try:
+                age = time_info.currentTime - time_info.inputBufferAdcTime
+            except AttributeError:
+                age = 0.0
+            if not 0.0 < age < 1.0:
+                age = frames / self.device_rate
+            # The newest output sample stands for the block's last input sample, less the filter delay.
+            last_captured = time.monotonic() - age + (frames - 1) / self.device_rate
+            if self.resampler is not None:
+                last_captured -= self.resampler.delay
+            self._mark_capture(last_captured, self._ring._written + len(samples) - 1)
+        self._ring.write(samples)
+
+    @property
+    def overruns(self):
+        return self._ring.overruns
+
+    def push(self, samples):
+        """Write int16 mono samples as if the device had captured them (replays and benchmarks)."""
+        if self.echo_canceller is not None:
+            self._mark_capture(time.monotonic() - len(samples) / self.sample_rate, self._ring._written)
+        self._ring.write(samples)
+
+    def start(self):
+        if self._stream is not None:
+            return
+        try:
+            self._stream = sd.InputStream(samplerate=self.device_rate,
+                                          channels=self.channels,
+                                          dtype='int16',
+                                          device=self.device,
+                                          blocksize=self.device_rate * self.frame_ms // 1000,
+                                          callback=self._callback)
+            self._stream.start()
+        except Exception as e:
+            self._stream = None
+            print("💥 Failed to open input stream:", e)
+            raise RuntimeError("❌ Could not access microphone. Check your sound box or input config.")
+        if self.resampler is None:
+            print(f"🎙️ Microphone stream open on device {self.device} at {self.sample_rate} Hz")
+        else:
+            print(f"🎙️ Microphone stream open on device {self.device} at {self.device_rate} Hz x{self.channels}, "
+                  f"resampled to {self.sample_rate} Hz mono ({self.resampler.taps} taps per phase)")
+
+    def read_frame(self, timeout=None):
+        frame = self._ring.read(self.frame_samples, timeout)
+        if frame is not None and self.echo_canceller is not None and self._anchor is not None:
+            frame = self.echo_canceller.cancel(frame, self.sample_time(self._ring.last_read_start))
+        return frame
+
+    def read_utterance(self, timeout=None, on_speech=None):
+        """Block until the segmenter closes an utterance; None on timeout or close."""
+        while True:
+            frame = self.read_frame(timeout)
+            if frame is None:
+                return None
+            utterance = self.segmenter.process(frame, on_speech)
+            if utterance is not None:
+                return utterance
+
+    def close(self):
+        self._ring.close()
+        if self._stream is not None:
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
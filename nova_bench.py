@@ -0,0 +1,298 @@
+"""Replay utterances through Nova's conversation pipeline and report per-stage latency.
+
+Audio (a directory of WAV files, or synthetic bursts when none is given)
+is pushed frame by frame through the real MicStream ring buffer and
+UtteranceSegmenter, recognized by the stub STT backend, answered by
+nova_dialog.Conversation (the same dispatch nova_chimp uses, over a
+MemoryStore in a throwaway directory) and spoken through the real
+SpeechScheduler and sentence-pipelined TTS with the stub synthesizer and
+a sleep-based player. STT/TTS latencies are simulated and configurable,
+so runs are repeatable. The learning queue's worker is not started, so
+ChatBot never loads; a turn only pays for submit().
+
+    python nova_bench.py --wav-dir clips/ --output bench.json
+    python nova_bench.py --baseline bench_baseline.json            # exit 1 on regression
+    python nova_bench.py --baseline bench_baseline.json --update-baseline
+
+bench_baseline.json in the repo is a default synthetic run; refresh it
+with --update-baseline on the machine the comparison runs on.
+
+A WAV file may have a .txt file of the same name next to it holding its
+transcript; without one the stub recognizer cycles through TRANSCRIPTS.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import wave
+
+import numpy as np
+
+import nova_audio
+import nova_dialog
+import nova_learning
+import nova_memory_store
+import nova_scheduler
+import nova_stt
+import nova_tts
+
+TAUGHT = {
+    "what is your name": "I'm Nova. Your digital jungle buddy.",
+    "tell me a joke": "Why did the chimp cross the road? To get to the other vine.",
+    "how old are you": "Old enough to know bananas. Young enough to want more.",
+    "good night": "Good night, jungle boss. Sleep tight!",
+}
+TRANSCRIPTS = [
+    "what is your name",             # exact trigger
+    "nova tell me a joke please",    # trigger inside a longer sentence
+    "how old r you",                 # near miss, answered by the fuzzy index
+    "what's the weather like on mars",  # unknown
+]
+STAGES = ("capture_frame", "stt_final", "match", "queue_to_audio", "turn", "reply")
+
+
+def load_wav(path, sample_rate=nova_audio.SAMPLE_RATE):
+    """int16 mono samples at sample_rate from a 16-bit PCM WAV file."""
+    with wave.open(path, "rb") as wav:
+        if wav.getsampwidth() != 2:
+            raise ValueError(f"{path}: only 16-bit PCM is supported")
+        channels, rate = wav.getnchannels(), wav.getframerate()
+        samples = np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16)
+    samples = samples.reshape(-1, channels).mean(axis=1)
+    if rate != sample_rate:
+        # Linear interpolation is plenty for a VAD/latency benchmark.
+        n = int(len(samples) * sample_rate / rate)
+        samples = np.interp(np.arange(n) * rate / sample_rate, np.arange(len(samples)), samples)
+    return samples.astype(np.int16)
+
+
+def load_clips(wav_dir):
+    clips = []
+    for name in sorted(os.listdir(wav_dir)):
+        if not name.lower().endswith(".wav"):
+            continue
+        path = os.path.join(wav_dir, name)
+        transcript_path = os.path.splitext(path)[0] + ".txt"
+        transcript = None
+        if os.path.exists(transcript_path):
+            with open(transcript_path, "r", encoding="utf-8") as f:
+                transcript = f.read().strip()
+        clips.append((load_wav(path), transcript))
+    return clips
+
+
+def synthetic_clips(count, seed=0, sample_rate=nova_audio.SAMPLE_RATE):
+    """Voiced-ish bursts (a harmonic tone over low noise) between stretches of room noise."""
+    rng = np.random.default_rng(seed)
+    clips = []
+    for i in range(count):
+        speech_s = rng.uniform(0.8, 2.5)
+        t = np.arange(int(speech_s * sample_rate)) / sample_rate
+        f0 = rng.uniform(110, 220)
+        voice = 2500 * np.sin(2 * np.pi * f0 * t) + 800 * np.sin(2 * np.pi * 2 * f0 * t)
+        voice *= 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t) ** 2  # syllable-rate wobble
+        lead = rng.normal(0, 30, int(0.6 * sample_rate))
+        tail = rng.normal(0, 30, int(0.8 * sample_rate))
+        samples = np.concatenate([lead, voice + rng.normal(0, 30, len(t)), tail])
+        clips.append((np.clip(samples, -32768, 32767).astype(np.int16), None))
+    return clips
+
+
+def percentiles(values):
+    if not values:
+        return {"count": 0}
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {"count": len(values), "mean_ms": float(np.mean(values)),
+            "p50_ms": float(p50), "p95_ms": float(p95), "p99_ms": float(p99)}
+
+
+class PipelineBench:
+    def __init__(self, stt_latency=0.05, tts_latency=0.15, tts_latency_per_char=0.004,
+                 playback_speed=0.0, filler_triggers=1000, realtime=False, seed=0):
+        self.realtime = realtime
+        self.playback_speed = playback_speed  # 1.0 plays in real time, 0 skips the wait
+        self.timings = {stage: [] for stage in STAGES}
+        self.synthesizer = nova_tts.StubSynthesizer(latency=tts_latency,
+                                                    latency_per_char=tts_latency_per_char)
+        rng = random.Random(seed)
+        words = [f"w{i}" for i in range(2000)]
+        triggers = dict(TAUGHT)
+        for i in range(filler_triggers):
+            triggers[" ".join(rng.choice(words) for _ in range(rng.randint(2, 5)))] = f"reply {i}"
+        defaults = {"custom_responses": triggers, "trigger_aliases": {},
+                    "user_inputs": [], "unknown_inputs": []}
+        self._memory_dir = tempfile.mkdtemp(prefix="nova_bench_")
+        self.memory_store = nova_memory_store.MemoryStore(
+            os.path.join(self._memory_dir, "nova_memory.json"), defaults,
+            history_keys=("user_inputs", "unknown_inputs"))
+        self.memory_store.load()
+        self.conversation = nova_dialog.Conversation(
+            self.memory_store, self._say, learning_queue=nova_learning.LearningQueue())
+        self.stt_latency = stt_latency
+        self.scheduler = nova_scheduler.SpeechScheduler(self._speak, on_idle=None).start()
+        self._turn = None
+
+    def close(self):
+        self.memory_store.flush(timeout=5)
+        shutil.rmtree(self._memory_dir, ignore_errors=True)
+
+    def _play(self, pcm, sample_rate):
+        if self.playback_speed:
+            time.sleep(len(pcm) / 2 / sample_rate * self.playback_speed)
+
+    def _speak(self, text, cancel):
+        turn = self._turn
+
+        def on_play(pcm, sample_rate):
+            if "first_audio" not in turn:
+                turn["first_audio"] = time.perf_counter()
+
+        nova_tts.speak_pipelined(text, play=self._play, synthesizer=self.synthesizer,
+                                 on_play=on_play, cancel=cancel)
+        turn["done_at"] = time.perf_counter()
+        turn["done"].set()
+
+    def _say(self, text):
+        self._turn["replied_at"] = time.perf_counter()
+        self.scheduler.say(text)
+
+    def run(self, clips):
+        transcripts = [t if t is not None else TRANSCRIPTS[i % len(TRANSCRIPTS)]
+                       for i, (_, t) in enumerate(clips)]
+        recognizer = nova_stt.StubRecognizer(transcripts, latency=self.stt_latency)
+        mic = nova_audio.MicStream(device=None)
+        frame = mic.frame_samples
+        frame_s = frame / mic.sample_rate
+        session = None
+
+        def on_speech(samples):
+            nonlocal session
+            if session is None:
+                session = recognizer.start(mic.sample_rate)
+            session.feed(samples)
+
+        audio = np.concatenate([samples for samples, _ in clips])
+        started = time.perf_counter()
+        next_frame_at = started
+        utterances = 0
+        for offset in range(0, len(audio) - frame + 1, frame):
+            if self.realtime:
+                next_frame_at += frame_s
+                delay = next_frame_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            t0 = time.perf_counter()
+            mic.push(audio[offset:offset + frame])
+            utterance = mic.read_utterance(timeout=0, on_speech=on_speech)
+            emitted = time.perf_counter()
+            self.timings["capture_frame"].append((emitted - t0) * 1000)
+            if utterance is None:
+                continue
+            turn_session, session = session or recognizer.start(mic.sample_rate), None
+            text = turn_session.finish(utterance)
+            t1 = time.perf_counter()
+            self._turn = turn = {"done": threading.Event()}
+            self.conversation.respond_to(text or "")
+            turn["done"].wait()
+            t2 = turn["replied_at"]
+            self.timings["stt_final"].append((t1 - emitted) * 1000)
+            self.timings["match"].append((t2 - t1) * 1000)
+            self.timings["queue_to_audio"].append((turn["first_audio"] - t2) * 1000)
+            self.timings["turn"].append((turn["first_audio"] - emitted) * 1000)
+            self.timings["reply"].append((turn["done_at"] - t2) * 1000)
+            utterances += 1
+            if self.realtime:
+                next_frame_at = time.perf_counter()  # the user waits for the reply
+        elapsed = time.perf_counter() - started
+        return {
+            "stages": {stage: percentiles(values) for stage, values in self.timings.items()},
+            "throughput": {
+                "utterances": utterances,
+                "clips": len(clips),
+                "wall_s": elapsed,
+                "utterances_per_s": utterances / elapsed if elapsed else 0.0,
+                "audio_s_per_wall_s": len(audio) / mic.sample_rate / elapsed if elapsed else 0.0,
+            },
+        }
+
+
+def compare(report, baseline, tolerance=0.25, slack_ms=1.0):
+    """Regressions of report against baseline: p50/p95 slower, or throughput lower, beyond tolerance."""
+    problems = []
+    for stage, base in baseline.get("stages", {}).items():
+        current = report["stages"].get(stage, {})
+        for key in ("p50_ms", "p95_ms"):
+            if key in base and key in current and current[key] > base[key] * (1 + tolerance) + slack_ms:
+                problems.append(f"{stage} {key}: {current[key]:.2f} ms vs baseline {base[key]:.2f} ms")
+    base_rate = baseline.get("throughput", {}).get("utterances_per_s")
+    rate = report["throughput"]["utterances_per_s"]
+    if base_rate and rate < base_rate * (1 - tolerance):
+        problems.append(f"throughput: {rate:.2f} utterances/s vs baseline {base_rate:.2f}")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wav-dir", help="directory of 16-bit WAV utterances (default: synthetic)")
+    parser.add_argument("--synthetic", type=int, default=24, help="synthetic utterances when no --wav-dir")
+    parser.add_argument("--stt-latency", type=float, default=0.05, help="seconds per final recognition")
+    parser.add_argument("--tts-latency", type=float, default=0.15, help="seconds per synthesized sentence")
+    parser.add_argument("--tts-latency-per-char", type=float, default=0.004)
+    parser.add_argument("--playback-speed", type=float, default=0.0,
+                        help="1.0 waits out the audio in real time, 0 skips it")
+    parser.add_argument("--triggers", type=int, default=1000, help="filler triggers taught to the matcher")
+    parser.add_argument("--realtime", action="store_true", help="pace capture at the audio's real rate")
+    parser.add_argument("--output", help="write the JSON report here as well as to stdout")
+    parser.add_argument("--baseline", help="compare against this report; exit 1 on regression")
+    parser.add_argument("--update-baseline", action="store_true", help="overwrite --baseline with this run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--slack-ms", type=float, default=1.0, help="allowed absolute slowdown per stage")
+    args = parser.parse_args(argv)
+
+    clips = load_clips(args.wav_dir) if args.wav_dir else synthetic_clips(args.synthetic)
+    if not clips:
+        parser.error(f"no .wav files in {args.wav_dir}")
+    # Nova's own console chatter goes to stderr so stdout stays the JSON report.
+    with contextlib.redirect_stdout(sys.stderr):
+        bench = PipelineBench(stt_latency=args.stt_latency, tts_latency=args.tts_latency,
+                              tts_latency_per_char=args.tts_latency_per_char,
+                              playback_speed=args.playback_speed, filler_triggers=args.triggers,
+                              realtime=args.realtime)
+        try:
+            report = bench.run(clips)
+        finally:
+            bench.close()
+    report["config"] = {k: v for k, v in vars(args).items()
+                        if k not in ("output", "baseline", "update_baseline")}
+    payload = json.dumps(report, indent=2)
+    print(payload)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+
+    if args.baseline and args.update_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(payload + "\n")
+        print(f"Baseline written to {args.baseline}", file=sys.stderr)
+    elif args.baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+        problems = compare(report, baseline, args.tolerance, args.slack_ms)
+        if report["throughput"]["utterances"] < report["throughput"]["clips"]:
+            problems.append("segmenter found {utterances} of {clips} utterances".format(**report["throughput"]))
+        for problem in problems:
+            print("REGRESSION:", problem, file=sys.stderr)
+        if problems:
+            return 1
+        print("No regressions against", args.baseline, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
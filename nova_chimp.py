@@ -1,113 +1,144 @@
 import os
+import sys
 import time
-import json
 import threading
 import random
-import tempfile
+import importlib
+import contextlib
+import atexit
 
-# Debug: Check GPU availability with PyTorch
-try:
-    import torch
-    print("CUDA available:", torch.cuda.is_available())
-    if torch.cuda.is_available():
-        print("GPU device name:", torch.cuda.get_device_name(0))
-    else:
-        print("No CUDA GPU detected!")
-except Exception as e:
-    print("Error checking CUDA:", e)
+_startup_started = time.perf_counter()
+PROFILE_STARTUP = "--profile-startup" in sys.argv
+startup_timings = []  # (kind, name, seconds) for --profile-startup
 
-import nova_overlay  # Your overlay module (if you want visuals)
-import sounddevice as sd
-import simpleaudio as sa
-from pydub import AudioSegment
-from scipy.io import wavfile as wav
-from google.cloud import texttospeech
-from PIL import Image  # For image resizing
-import io
-import speech_recognition as sr
-import pyaudio
-import numpy as np
+@contextlib.contextmanager
+def startup_phase(name, kind="phase"):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings.append((kind, name, time.perf_counter() - started))
+
+def print_startup_profile():
+    print("⏱️ Startup profile:")
+    for kind, name, seconds in startup_timings:
+        print(f"  {kind:<7} {name:<32} {seconds * 1000:9.1f} ms")
+    print(f"  {'total':<7} {'until ready':<32} {(time.perf_counter() - _startup_started) * 1000:9.1f} ms")
+
+with startup_phase("nova_overlay", kind="import"):
+    import nova_overlay  # Your overlay module (if you want visuals)
+import nova_trace  # stdlib only; a no-op unless --trace is given
 
-def get_valid_input_device():
-    p = pyaudio.PyAudio()
-    for i in range(p.get_device_count()):
-        info = p.get_device_info_by_index(i)
-        if info.get('maxInputChannels') > 0:
-            print(f"✅ Using microphone [{i}] {info['name']}")
-            return i
-    raise RuntimeError("❌ No valid input devices found.")
+# The audio, TTS and matching stack (numpy, PortAudio, speech_recognition, ...)
+# is imported by load_heavy_modules() once the overlay is on screen.
+nova_audio = nova_tts = nova_stt = nova_memory_store = nova_matcher = nova_learning = nova_scheduler = None
+nova_echo = nova_dialog = None
 
-device_index = get_valid_input_device()
-recognizer = sr.Recognizer()
+def load_heavy_modules():
+    global nova_audio, nova_tts, nova_stt, nova_memory_store, nova_matcher, nova_learning, nova_scheduler
+    global nova_echo, nova_dialog
+    # Third-party first so each line of the profile is that module's own cost.
+    for name in ("numpy", "sounddevice", "simpleaudio", "speech_recognition"):
+        with startup_phase(name, kind="import"):
+            importlib.import_module(name)
+    with startup_phase("nova_audio", kind="import"):
+        import nova_audio
+    with startup_phase("nova_tts", kind="import"):
+        import nova_tts
+    with startup_phase("nova_stt", kind="import"):
+        import nova_stt
+    with startup_phase("nova_memory_store", kind="import"):
+        import nova_memory_store
+    with startup_phase("nova_matcher", kind="import"):
+        import nova_matcher
+    with startup_phase("nova_learning", kind="import"):
+        import nova_learning
+    with startup_phase("nova_scheduler", kind="import"):
+        import nova_scheduler
+    with startup_phase("nova_echo", kind="import"):
+        import nova_echo
+    with startup_phase("nova_dialog", kind="import"):
+        import nova_dialog
+
+def check_cuda():
+    # Debug: Check GPU availability with PyTorch (only with --check-cuda; torch is slow to import)
+    try:
+        import torch
+        print("CUDA available:", torch.cuda.is_available())
+        if torch.cuda.is_available():
+            print("GPU device name:", torch.cuda.get_device_name(0))
+        else:
+            print("No CUDA GPU detected!")
+    except Exception as e:
+        print("Error checking CUDA:", e)
 
 # Global memory dictionary
-memory = {
+MEMORY_DEFAULTS = {
     "user_inputs": [],
     "nova_responses": [],
     "last_topics": [],
     "custom_responses": {},
+    "trigger_aliases": {},
     "unknown_inputs": []
 }
+memory = dict(MEMORY_DEFAULTS)
 MEMORY_FILE = "nova_memory.json"
+HISTORY_HOT_WINDOW = 200  # recent turns kept in RAM; older ones live in the archive files
+HISTORY_RETENTION_DAYS = None  # prune archived turns older than this at startup (None keeps all)
+# Created by load_memory() / start_background_systems() after load_heavy_modules().
+memory_store = None
+conversation = None  # nova_dialog.Conversation: matching, teaching and learning
+learning_queue = None
+scheduler = None
+NOISE_FLOOR_FILE = os.path.join(os.path.dirname(os.path.abspath(MEMORY_FILE)), "nova_noise_floor.json")
+# Scored input devices; re-probed only when the set of devices PortAudio reports changes.
+DEVICE_CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(MEMORY_FILE)), "nova_devices.json")
 VOICE_NAME = "en-US-Wavenet-F"  # This is our chosen TTS voice
-AUDIO_FILE = "nova_speech.wav"
-last_spoken_time = 0
-is_listening = True
 SILENT_TIMEOUT = 20
 RANDOM_FACT_COOLDOWN = 60  # seconds
-last_random_fact_time = 0
+ECHO_TAIL = 0.5  # seconds after Nova stops talking that the mic may still hear her
+# With echo cancellation the mic stays open while Nova talks once the canceller has converged;
+# until then (and with --no-aec) audio overlapping her speech is ignored as before.
+ECHO_CANCELLATION = "--no-aec" not in sys.argv
+ECHO_PLAYBACK_LATENCY = 0.03  # seconds between handing audio to the player and it leaving the speaker
+BARGE_IN_MS = 300  # this much user speech over Nova's voice cuts her off
+VAD_PRE_ROLL_MS = 300   # audio kept from before speech onset
+VAD_HANGOVER_MS = 400   # trailing silence that ends an utterance
+# Speech recognizer: "auto" (offline Vosk if its model is unpacked, else Google), "google", "vosk" or "stub".
+STT_BACKEND = next((arg.split("=", 1)[1] for arg in sys.argv if arg.startswith("--stt=")), "auto")
+# --trace writes per-turn spans to nova_trace.jsonl; --metrics-port=N also serves /metrics on localhost.
+TRACE_ENABLED = "--trace" in sys.argv
+METRICS_PORT = next((int(arg.split("=", 1)[1]) for arg in sys.argv if arg.startswith("--metrics-port=")), None)
 
 def load_memory():
-    global memory
-    if os.path.exists(MEMORY_FILE):
-        try:
-            memory = json.load(open(MEMORY_FILE, "r"))
-            if "user_inputs" not in memory:
-                memory["user_inputs"] = []
-            if "nova_responses" not in memory:
-                memory["nova_responses"] = []
-            if "last_topics" not in memory:
-                memory["last_topics"] = []
-            if "custom_responses" not in memory:
-                memory["custom_responses"] = {}
-            if "unknown_inputs" not in memory:
-                memory["unknown_inputs"] = []
-            print("Memory loaded successfully.")
-        except Exception as e:
-            print("Failed to load memory:", e)
-    else:
-        print("No memory file found; starting fresh.")
+    global memory, memory_store, conversation
+    memory_store = nova_memory_store.MemoryStore(
+        MEMORY_FILE, MEMORY_DEFAULTS,
+        history_keys=("user_inputs", "nova_responses", "unknown_inputs"),
+        hot_window=HISTORY_HOT_WINDOW)
+    memory = memory_store.load()
+    conversation = nova_dialog.Conversation(memory_store, speak)
+    if HISTORY_RETENTION_DAYS is not None:
+        for key in memory_store.history_keys:
+            memory_store.compact_history(key, max_age=HISTORY_RETENTION_DAYS * 86400, timeout=0)
 
 def save_memory():
-    try:
-        with open(MEMORY_FILE, "w") as f:
-            json.dump(memory, f, indent=2)
-        print("Memory saved.")
-    except Exception as e:
-        print("Failed to save memory:", e)
+    # Changes are journaled as they happen; this folds them into a fresh snapshot.
+    # Runs at exit, so the last debounced changes still reach the disk.
+    if memory_store is not None:
+        memory_store.compact(timeout=5)
 
-def resize_overlay(image_path, target_height):
-    try:
-        overlay_image = Image.open(image_path)
-    except Exception as e:
-        print("Error opening overlay image:", e)
-        return None
-    width, height = overlay_image.size
-    scale_factor = target_height / height
-    new_size = (int(width * scale_factor), target_height)
-    resized_image = overlay_image.resize(new_size)
-    resized_image.save("resized_overlay.png")
-    return "resized_overlay.png"
+FACTS = [
+    "Chimpanzees share about 98% of their DNA with humans.",
+    "A chimp's brain weighs roughly 400 grams.",
+    "Chimpanzees can use tools to crack nuts.",
+    "They have complex social structures and communicate in many ways.",
+    "Chimpanzees are among our closest living relatives."
+]
+PREWARM_TTS = True  # put nova_dialog.STATIC_PHRASES and FACTS in the TTS cache at startup
 
 def get_random_fact():
-    facts = [
-        "Chimpanzees share about 98% of their DNA with humans.",
-        "A chimp's brain weighs roughly 400 grams.",
-        "Chimpanzees can use tools to crack nuts.",
-        "They have complex social structures and communicate in many ways.",
-        "Chimpanzees are among our closest living relatives."
-    ]
-    return random.choice(facts)
+    return random.choice(FACTS)
 
 def setup_tray():
     print("[TRAY] Setup placeholder.")
@@ -116,188 +147,210 @@ def setup_tray():
             print("Tray icon would be running now.")
     return DummyTray()
 
-def record_with_sounddevice(duration=5, samplerate=16000, mic_index=None):
-    if mic_index is None:
-        print("🎤 Scanning available input devices...")
-        devices = sd.query_devices()
-        for i, device in enumerate(devices):
-            print(f"[{i}] {device['name']} - inputs: {device['max_input_channels']}")
-        mic_index = next((i for i, d in enumerate(devices) if d['max_input_channels'] > 0), None)
-    if mic_index is None:
-        raise RuntimeError("❌ No valid input device found. Please check your mic or audio interface.")
-    print(f"✅ Using input device index {mic_index}")
-    try:
-        audio = sd.rec(int(duration * samplerate),
-                       samplerate=samplerate,
-                       channels=1,
-                       dtype='int16',
-                       device=mic_index)
-        sd.wait()
-    except Exception as e:
-        print("💥 Failed to open input stream:", e)
-        raise RuntimeError("❌ Could not access microphone. Check your sound box or input config.")
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as f:
-        wav.write(f.name, samplerate, audio)
-        print(f"Audio recorded to {f.name}")
-        return f.name
-
 def listen_loop():
     try:
-        recognizer = sr.Recognizer()
+        with startup_phase("input device probe"):
+            devices = nova_audio.DeviceCatalog(DEVICE_CACHE_FILE).scan()
+        with startup_phase("speech recognizer"):
+            recognizer = nova_stt.create_recognizer(STT_BACKEND)
+        print(f"🗣️ Speech recognition backend: {recognizer.name}")
+        noise_model = nova_audio.NoiseFloorModel(state_path=NOISE_FLOOR_FILE)
+        echo_canceller = None
+        if ECHO_CANCELLATION:
+            nova_audio.playback_reference = nova_echo.PlaybackReference(
+                nova_audio.SAMPLE_RATE, latency=ECHO_PLAYBACK_LATENCY)
+            echo_canceller = nova_echo.EchoCanceller(
+                nova_audio.playback_reference, block=nova_audio.SAMPLE_RATE * nova_audio.FRAME_MS // 1000)
+            print("🔇 Echo cancellation on; NOVA keeps listening while she talks")
+        with startup_phase("microphone stream open"):
+            mic = nova_audio.open_microphone(devices,
+                                             echo_canceller=echo_canceller,
+                                             noise_model=noise_model,
+                                             pre_roll_ms=VAD_PRE_ROLL_MS,
+                                             hangover_ms=VAD_HANGOVER_MS)
         print("🎧 NOVA is listening for your voice...")
+        if PROFILE_STARTUP:
+            print_startup_profile()
+        session = None
+        prefetched = set()
+        barge_in_frames = max(1, BARGE_IN_MS // nova_audio.FRAME_MS)
+        heard = 0          # on_speech calls in this utterance
+        talked_over = 0    # of those, frames after onset heard while Nova was talking
+        barged_in = False
+
+        def echo_removed():
+            # Only once the canceller has converged is what it lets through the user rather than Nova.
+            return echo_canceller is not None and echo_canceller.converged
+
+        def on_speech(frame):
+            # Streaming backends decode while the user talks; partials let the reply get ready early.
+            nonlocal session, heard, talked_over, barged_in
+            if session is None:
+                session = recognizer.start(mic.sample_rate)
+            heard += 1
+            speaking = scheduler.speaking.is_set()
+            # The replayed pre-roll arrives all at once at onset; it is not time spent talking over Nova.
+            if speaking and heard > mic.segmenter.onset_frames and echo_removed():
+                # The mic hears the user, not Nova: enough of it and Nova stops mid-sentence.
+                talked_over += 1
+                if talked_over == barge_in_frames:
+                    print("✋ Barge-in, NOVA stops talking")
+                    nova_trace.incr("speech.barge_in")
+                    barged_in = True
+                    scheduler.cancel()
+            if recognizer.streaming and (not speaking or echo_removed()):
+                partial = session.feed(frame)
+                if partial:
+                    prefetch_reply(partial, prefetched)
+
         while True:
-            if is_listening:
-                try:
-                    wav_path = record_with_sounddevice(duration=5, mic_index=device_index)
-                    with sr.AudioFile(wav_path) as source:
-                        recognizer.adjust_for_ambient_noise(source, duration=1.5)
-                        print("Energy threshold set to:", recognizer.energy_threshold)
-                        audio = recognizer.record(source)
+            samples = mic.read_utterance(on_speech=on_speech)
+            if samples is None:
+                break
+            turn_session, session = session, None
+            prefetched.clear()
+            trusted = barged_in or echo_removed()
+            heard = talked_over = 0
+            barged_in = False
+            heard_until = time.monotonic()
+            heard_from = heard_until - len(samples) / mic.sample_rate
+            print("Energy threshold set to:", noise_model.threshold)
+            if not trusted and scheduler.overlaps_speech(heard_from, heard_until):
+                print("Ignoring audio captured while NOVA was talking.")
+            else:
+                scheduler.activity()
+                with nova_trace.turn():
+                    nova_trace.record("capture", time.time() - (heard_until - heard_from),
+                                      (heard_until - heard_from) * 1000, samples=len(samples))
                     try:
-                        text = recognizer.recognize_google(audio)
-                        print("You said:", text)
-                        memory["user_inputs"].append(text)
-                        if text.lower().startswith("teach nova:"):
-                            try:
-                                _, content = text.split("teach nova:", 1)
-                                trigger_phrase, desired_answer = content.split("=>", 1)
-                                trigger_phrase = trigger_phrase.strip().lower()
-                                desired_answer = desired_answer.strip()
-                                memory["custom_responses"][trigger_phrase] = desired_answer
-                                speak("Got it. I'll remember that.")
-                                save_memory()
-                            except Exception as teach_error:
-                                speak("I couldn't learn that. Please use the format: 'teach nova: trigger phrase => desired answer'")
-                        elif any(trigger in text.lower() for trigger in memory["custom_responses"]):
-                            for trigger, custom_response in memory["custom_responses"].items():
-                                if trigger in text.lower():
-                                    speak(custom_response)
-                                    break
-                        elif "nova" in text.lower() or "hello" in text.lower():
-                            speak("Yes, jungle boss!")
-                        else:
-                            response = learn_and_respond(text)
-                            speak(response)
-                            save_memory()
-                    except sr.UnknownValueError:
-                        print("Google Speech Recognition could not understand audio")
-                    except sr.RequestError as req_err:
-                        print("Could not request results from Google Speech Recognition service; Error:", req_err)
+                        with nova_trace.span("recognition", backend=recognizer.name):
+                            text = (turn_session or recognizer.start(mic.sample_rate)).finish(samples)
                     except Exception as e:
-                        print("Unexpected error during recognition:", e)
-                except Exception as e:
-                    print("Speech recognition error:", e)
+                        print(f"Speech recognition error ({recognizer.name}):", e)
+                        nova_trace.incr("stt.failures")
+                        text = None
+                    else:
+                        if text is None:
+                            print(f"Speech recognition ({recognizer.name}) could not understand audio")
+                            nova_trace.incr("stt.not_understood")
+                    if text is not None:
+                        try:
+                            conversation.respond_to(text)
+                        except Exception as e:
+                            print("Unexpected error while responding:", e)
+                nova_trace.incr("turns")
+                nova_trace.gauge("mic.overruns", mic.overruns)
+                nova_trace.gauge("learning.pending", learning_queue.progress()["pending"])
+                nova_audio.io_stats["turns"] += 1
+                print("Audio disk I/O so far: {} reads, {} writes over {} turns".format(
+                    nova_audio.io_stats["disk_reads"], nova_audio.io_stats["disk_writes"],
+                    nova_audio.io_stats["turns"]))
+                print("TTS cache:", nova_tts.get_cache().summary())
     except Exception as e:
         print("💥 listen_loop crashed:", e)
 
-def learn_and_respond(text):
-    for trigger, custom_response in memory["custom_responses"].items():
-        if trigger in text.lower():
-            return custom_response
-    memory["unknown_inputs"].append(text)
-    save_memory()
-    return f"I don't have a learned response for '{text}' yet. I'll learn soon!"
+def cache_reply(text):
+    for sentence in nova_tts.split_sentences(text) or [text]:
+        nova_tts.synthesize(sentence, voice_name=VOICE_NAME)
 
-def refresh_facts():
+def prefetch_reply(partial, prefetched):
+    """Partial-transcript hook: start synthesizing a taught answer as soon as its trigger is heard."""
+    match = conversation.match_partial(partial)
+    if match is None or match[1] in prefetched:
+        return
+    prefetched.add(match[1])
+    print(f"Heard '{match[0]}' before the end of the sentence; preparing the reply.")
+    scheduler.run_blocking(cache_reply, match[1])
+
+def start_lipsync(pcm, sample_rate):
     try:
-        while True:
-            time.sleep(60)
+        envelope = nova_audio.amplitude_envelope(pcm, sample_rate, nova_overlay.FRAME_RATE)
+        nova_overlay.start_lipsync(envelope, nova_overlay.FRAME_RATE)
     except Exception as e:
-        print("💥 refresh_facts crashed:", e)
+        print("Overlay lip-sync error:", e)
+
+def speak(text, priority=None):
+    """Queue text to be said; replies go ahead of (and interrupt) idle facts."""
+    if priority is None:
+        priority = nova_scheduler.PRIORITY_REPLY
+    scheduler.say(text, priority, trace=nova_trace.current())
 
-def speak(text):
-    global last_spoken_time, is_listening
+def say_now(text, cancel=None):
+    # Runs on the scheduler's executor; blocks until the speech is done or cancelled.
     print("NOVA:", text)
     
-    was_listening = is_listening
-    is_listening = False
-    print("Listening disabled for speaking.")
-    
     try:
         nova_overlay.set_speaking(True)
     except Exception as e:
         print("Overlay error (start):", e)
     
-    resized_image_path = resize_overlay("TheNova.png", target_height=240)
-    if resized_image_path:
-        try:
-            overlay_instance = nova_overlay.get_overlay_instance()
-            if overlay_instance is not None:
-                overlay_instance.update_image(resized_image_path)
-            else:
-                print("No overlay instance available to update image.")
-        except Exception as e:
-            print("Overlay update error:", e)
-    else:
-        print("No resized image available.")
-    
-    # Use SSML to adjust prosody for a more natural output.
-    ssml_text = f"<speak><prosody rate='medium' pitch='-5st'>{text}</prosody></speak>"
-    synthesis_input = texttospeech.SynthesisInput(ssml=ssml_text)
-    voice = texttospeech.VoiceSelectionParams(language_code="en-AU", name=VOICE_NAME)
-    audio_config = texttospeech.AudioConfig(
-        audio_encoding=texttospeech.AudioEncoding.LINEAR16,
-        sample_rate_hertz=16000
-    )
-    tts_client = texttospeech.TextToSpeechClient()
-    response = tts_client.synthesize_speech(
-        input=synthesis_input, voice=voice, audio_config=audio_config
-    )
-    with open(AUDIO_FILE, "wb") as out:
-        out.write(response.audio_content)
-    
     try:
-        wave_obj = sa.WaveObject.from_wave_file(AUDIO_FILE)
-        play_obj = wave_obj.play()
-        play_obj.wait_done()
+        stats = nova_tts.speak_pipelined(text, voice_name=VOICE_NAME, on_play=start_lipsync, cancel=cancel)
+        print("TTS first audio after {:.3f}s".format(stats["time_to_first_audio"] or 0.0))
+        if stats["cancelled"]:
+            print("Speech interrupted.")
     except Exception as e:
         print("Playback error:", e)
+        nova_trace.incr("playback.errors")
     
     try:
         nova_overlay.set_speaking(False)
     except Exception as e:
         print("Overlay error (end):", e)
-    
-    last_spoken_time = time.time()
-    time.sleep(2)
-    is_listening = was_listening
-    print("Listening re-enabled.")
-
-def silence_monitor():
-    global last_random_fact_time
-    try:
-        while True:
-            time.sleep(5)
-            if is_listening and time.time() - last_spoken_time > SILENT_TIMEOUT:
-                if time.time() - last_random_fact_time > RANDOM_FACT_COOLDOWN:
-                    speak(get_random_fact())
-                    last_random_fact_time = time.time()
-    except Exception as e:
-        print("💥 silence_monitor crashed:", e)
 
 if __name__ == "__main__":
-    load_memory()
     print("Starting Nova...")
+    atexit.register(save_memory)
+    if TRACE_ENABLED or METRICS_PORT is not None:
+        nova_trace.configure(enabled=True, path=nova_trace.TRACE_FILE if TRACE_ENABLED else None,
+                             http_port=METRICS_PORT)
     
     def start_background_systems():
-        threading.Thread(target=silence_monitor, daemon=True).start()
-        print("✅ silence_monitor started")
-        threading.Thread(target=refresh_facts, daemon=True).start()
-        print("✅ refresh_facts started")
+        global learning_queue, scheduler
+        tray_icon = setup_tray()
+        with startup_phase("heavy imports"):
+            load_heavy_modules()
+        with startup_phase("load memory"):
+            load_memory()
+        if PREWARM_TTS:
+            nova_tts.prewarm(nova_dialog.STATIC_PHRASES + FACTS, voice_name=VOICE_NAME)
+        nova_learning.warm_start()
+        learning_queue = nova_learning.LearningQueue(attach=conversation.attach_to_trigger).start()
+        conversation.learning_queue = learning_queue
+        print("✅ learning queue started")
+        # After SILENT_TIMEOUT quiet seconds the scheduler asks for a fact (at most once per cooldown).
+        scheduler = nova_scheduler.SpeechScheduler(
+            say_now, idle_timeout=SILENT_TIMEOUT, idle_cooldown=RANDOM_FACT_COOLDOWN,
+            on_idle=get_random_fact, echo_tail=ECHO_TAIL).start()
+        print("✅ speech scheduler started")
         threading.Thread(target=listen_loop, daemon=True).start()
         print("✅ listen_loop started")
-        tray_icon = setup_tray()
+        if "--check-cuda" in sys.argv:
+            threading.Thread(target=check_cuda, daemon=True).start()
         tray_icon.run()
     
-    threading.Thread(target=start_background_systems, daemon=True).start()
-    print("Background systems started. Launching overlay...")
+    background_started = threading.Event()
+    
+    def on_overlay_ready():
+        # Overlay is on screen; now bring up everything else without blocking the Tk loop.
+        if background_started.is_set():
+            return
+        background_started.set()
+        startup_timings.append(("phase", "overlay visible", time.perf_counter() - _startup_started))
+        threading.Thread(target=start_background_systems, daemon=True).start()
+        print("Background systems starting...")
+    
+    print("Launching overlay...")
     try:
-        nova_overlay.launch_overlay()
+        nova_overlay.launch_overlay(on_ready=on_overlay_ready)
         print("Overlay launched.")
     except Exception as overlay_error:
         print("Error launching overlay:", overlay_error)
+        on_overlay_ready()
     
     print("Nova is running. Waiting for voice input...")
-    while True:
-        print("Nova is still running...")
-        time.sleep(30)
+    # Keep the process alive without the overlay; daemon threads do the work.
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        print("Shutting down Nova...")
@@ -6,11 +6,15 @@ a = Analysis(
     pathex=[],
     binaries=[],
     datas=[],
-    hiddenimports=[],
+    # nova_chimp imports its audio/TTS stack inside load_heavy_modules(); these
+    # are the third-party names it times through importlib.
+    hiddenimports=['numpy', 'sounddevice', 'simpleaudio', 'speech_recognition'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
-    excludes=[],
+    # Nothing at runtime needs these; torch alone used to add gigabytes to unpack on every launch.
+    excludes=['torch', 'torchvision', 'torchaudio', 'tensorflow', 'matplotlib', 'IPython',
+              'pytest', 'scipy', 'pydub', 'pyaudio'],
     noarchive=False,
     optimize=0,
 )
@@ -0,0 +1,161 @@
+import sys
+import threading
+
+import nova_learning
+import nova_matcher
+import nova_trace
+
+ACK_PHRASE = "Yes, jungle boss!"
+TEACH_OK_PHRASE = "Got it. I'll remember that."
+TEACH_ERROR_PHRASE = "I couldn't learn that. Please use the format: 'teach nova: trigger phrase => desired answer'"
+FORGET_OK_PHRASE = "Okay, I forgot that one."
+FORGET_UNKNOWN_PHRASE = "That isn't something I learned on my own."
+# Spoken over and over, so worth having in the TTS cache before the first turn.
+STATIC_PHRASES = [ACK_PHRASE, TEACH_OK_PHRASE, TEACH_ERROR_PHRASE]
+FUZZY_MATCH_THRESHOLD = 0.55  # cosine similarity needed to answer a near-miss with a taught response
+# An attached alias becomes a permanent exact trigger, so it has to be a clearer near miss than an answer does.
+ALIAS_ATTACH_THRESHOLD = 0.7
+ALIAS_ATTACH_MARGIN = 0.2  # ...and clearly closer to its trigger than to any other
+
+
+class Conversation:
+    """Turns recognized text into Nova's reply: teach commands, taught triggers, near misses, learned replies.
+
+    Built on a loaded MemoryStore; taught triggers and their aliases are
+    indexed from it, and everything taught or heard is recorded back to it.
+    speak(text) is called with the reply. Unknown inputs go to
+    learning_queue, whose worker calls attach_to_trigger() back; the aliases
+    it learns that way are listed by aliases() and undone by forget_alias()
+    ("forget nova: <phrase>" out loud, or --forget-alias below). nova_chimp
+    and nova_bench both answer through this class, so the benchmark times
+    the same path a real turn takes.
+    """
+
+    def __init__(self, memory_store, speak, learning_queue=None, fuzzy_threshold=FUZZY_MATCH_THRESHOLD,
+                 alias_threshold=ALIAS_ATTACH_THRESHOLD, alias_margin=ALIAS_ATTACH_MARGIN):
+        self.memory_store = memory_store
+        self.speak = speak
+        self.learning_queue = learning_queue
+        self.alias_threshold = max(alias_threshold, fuzzy_threshold)
+        self.alias_margin = alias_margin
+        self.lock = threading.Lock()  # the learning worker adds aliases while the listen loop matches
+        memory = memory_store.data
+        custom = memory["custom_responses"]
+        self.trigger_index = nova_matcher.TriggerIndex(custom)
+        self.fuzzy_index = nova_matcher.FuzzyTriggerIndex(custom, threshold=fuzzy_threshold)
+        for alias, trigger in memory["trigger_aliases"].items():
+            if trigger in custom:
+                self.trigger_index.add(alias, custom[trigger])
+
+    def respond_to(self, text):
+        print("You said:", text)
+        self.memory_store.append("user_inputs", text)
+        with self.lock, nova_trace.span("match", kind="exact"):
+            match = self.trigger_index.match(text)
+        if text.lower().startswith("teach nova:"):
+            try:
+                _, content = text.split("teach nova:", 1)
+                trigger_phrase, desired_answer = content.split("=>", 1)
+                trigger_phrase = trigger_phrase.strip().lower()
+                desired_answer = desired_answer.strip()
+                self.memory_store.set_item("custom_responses", trigger_phrase, desired_answer)
+                with self.lock:
+                    self.trigger_index.add(trigger_phrase, desired_answer)
+                    self.fuzzy_index.add(trigger_phrase, desired_answer)
+                self.speak(TEACH_OK_PHRASE)
+            except Exception as teach_error:
+                self.speak(TEACH_ERROR_PHRASE)
+        elif text.lower().startswith("forget nova:"):
+            _, alias = text.split(":", 1)
+            self.speak(FORGET_OK_PHRASE if self.forget_alias(alias) else FORGET_UNKNOWN_PHRASE)
+        elif match is not None:
+            self.speak(match[1])
+        elif "nova" in text.lower() or "hello" in text.lower():
+            self.speak(ACK_PHRASE)
+        else:
+            response = self.learn_and_respond(text)
+            self.speak(response)
+
+    def match_partial(self, partial):
+        """The taught (trigger, response) a partial transcript already contains, or None."""
+        if partial.lower().startswith("teach nova"):
+            return None
+        with self.lock:
+            return self.trigger_index.match(partial)
+
+    def learn_and_respond(self, text):
+        with self.lock, nova_trace.span("match", kind="fuzzy"):
+            match = self.trigger_index.match(text)
+            near = self.fuzzy_index.best(text) if match is None else None
+        if match is not None:
+            return match[1]
+        if near is not None:
+            trigger, custom_response, score = near
+            print(f"Near match for '{trigger}' (similarity {score:.2f})")
+            return custom_response
+        with nova_trace.span("match", kind="learned"):
+            learned = nova_learning.known_response(text)
+        if learned is not None:
+            return learned
+        self.memory_store.append("unknown_inputs", text)
+        if self.learning_queue is not None:
+            self.learning_queue.submit(text)
+        return f"I don't have a learned response for '{text}' yet. I'll learn soon!"
+
+    def attach_to_trigger(self, text):
+        """Learning-worker hook: make a near-miss of a taught trigger answer like that trigger."""
+        alias = text.lower().strip()
+        with self.lock:
+            near = self.fuzzy_index.best(alias, threshold=self.alias_threshold, margin=self.alias_margin)
+            if near is None:
+                return False
+            trigger, custom_response, score = near
+            self.trigger_index.add(alias, custom_response)
+        self.memory_store.set_item("trigger_aliases", alias, trigger)
+        print(f"Learned '{alias}' as another way of saying '{trigger}' (similarity {score:.2f})")
+        return True
+
+    def aliases(self):
+        """Learned aliases as {alias: trigger}."""
+        with self.lock:
+            return dict(self.memory_store.data["trigger_aliases"])
+
+    def forget_alias(self, alias):
+        """Undo attach_to_trigger() for one alias; False if it was never learned."""
+        alias = alias.lower().strip()
+        custom = self.memory_store.data["custom_responses"]
+        with self.lock:
+            if alias not in self.memory_store.data["trigger_aliases"]:
+                return False
+            if alias in custom:
+                self.trigger_index.add(alias, custom[alias])  # taught as a trigger in its own right since
+            else:
+                self.trigger_index.remove(alias)
+        self.memory_store.delete_item("trigger_aliases", alias)
+        print(f"Forgot the alias '{alias}'")
+        return True
+
+
+def main(argv=None):
+    """List or remove learned aliases in a memory file; run it while Nova is not."""
+    import argparse
+    import nova_memory_store
+    parser = argparse.ArgumentParser(description="Inspect the trigger aliases Nova learned on her own.")
+    parser.add_argument("--memory", default="nova_memory.json")
+    parser.add_argument("--forget-alias", action="append", default=[], metavar="PHRASE")
+    args = parser.parse_args(argv)
+    store = nova_memory_store.MemoryStore(args.memory, {"custom_responses": {}, "trigger_aliases": {}})
+    store.load()
+    conversation = Conversation(store, print)
+    for alias in args.forget_alias:
+        if not conversation.forget_alias(alias):
+            print(f"No learned alias '{alias}'", file=sys.stderr)
+    if args.forget_alias:
+        store.compact()
+    else:
+        for alias, trigger in sorted(conversation.aliases().items()):
+            print(f"{alias!r} -> {trigger!r}")
+
+
+if __name__ == "__main__":
+    main()
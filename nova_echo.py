@@ -0,0 +1,242 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+BLOCK = 480  # one 30 ms capture frame
+
+
+class PlaybackReference:
+    """What the speaker was playing, on the time.monotonic() timeline the capture side also uses.
+
+    play_pcm() registers each clip with the time it started; the echo
+    canceller asks for the samples that were playing when a capture frame
+    was recorded. latency is added to every start time to account for the
+    output device's buffering.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE, latency=0.0, keep_seconds=2.0):
+        self.sample_rate = sample_rate
+        self.latency = latency
+        self.keep_seconds = keep_seconds
+        self._segments = []  # [start, end, float32 samples]
+        self._lock = threading.Lock()
+
+    def add(self, pcm, sample_rate=SAMPLE_RATE, started_at=None):
+        samples = np.frombuffer(pcm, dtype=np.int16) if isinstance(pcm, (bytes, bytearray)) else pcm
+        samples = samples.astype(np.float32)
+        if sample_rate != self.sample_rate:
+            n = int(len(samples) * self.sample_rate / sample_rate)
+            samples = np.interp(np.arange(n) * sample_rate / self.sample_rate,
+                                np.arange(len(samples)), samples).astype(np.float32)
+        start = (time.monotonic() if started_at is None else started_at) + self.latency
+        with self._lock:
+            horizon = time.monotonic() - self.keep_seconds
+            self._segments = [s for s in self._segments if s[1] >= horizon]
+            self._segments.append([start, start + len(samples) / self.sample_rate, samples])
+
+    def stop(self, at=None):
+        """Playback was cut short (barge-in): nothing registered plays past at."""
+        at = time.monotonic() if at is None else at
+        with self._lock:
+            for segment in self._segments:
+                if segment[1] > at:
+                    keep = max(0, int((at - segment[0]) * self.sample_rate))
+                    segment[1] = max(segment[0], at)
+                    segment[2] = segment[2][:keep]
+
+    def read(self, started_at, n):
+        """n reference samples starting at monotonic time started_at; silence where nothing played."""
+        out = np.zeros(n, dtype=np.float32)
+        with self._lock:
+            segments = list(self._segments)
+        for start, end, samples in segments:
+            offset = int(round((started_at - start) * self.sample_rate))
+            lo, hi = max(0, -offset), min(n, len(samples) - offset)
+            if hi > lo:
+                out[lo:hi] = samples[offset + lo:offset + hi]
+        return out
+
+
+class EchoCanceller:
+    """Partitioned-block frequency-domain NLMS echo canceller.
+
+    The echo path is modelled as partitions x block taps (240 ms with the
+    defaults), split into blocks so every frame costs one forward FFT of
+    the reference, one of the error, and a batched inverse/forward FFT
+    pair for the gradient constraint, all vectorized across partitions.
+
+    Adaptation freezes during double talk (Geigel detector on the
+    residual: what is left after cancellation is louder than dt_threshold
+    times the recent far-end peak) and for dt_hold_blocks afterwards, so
+    the user's own voice does not train the filter. The first
+    warmup_blocks of far-end audio always adapt. With no reference signal
+    in the filter's window, frames pass through untouched at no cost.
+
+    erle tracks how much echo the filter currently removes on far-end-only
+    blocks; converged turns true the first time that is enough (min_erle_db)
+    to treat what comes out as the user rather than Nova, and stays true, so
+    double talk the detector misses cannot take it back. Until then callers
+    should keep distrusting audio captured while Nova talks.
+    """
+
+    def __init__(self, reference=None, block=BLOCK, partitions=8, step=0.8, smoothing=0.9,
+                 dt_threshold=0.5, dt_hold_blocks=6, warmup_blocks=33, noise_level=100.0,
+                 min_erle_db=10.0, erle_smoothing=0.95):
+        self.reference = reference
+        self.block = block
+        self.partitions = partitions
+        self.step = step
+        self.smoothing = smoothing
+        self.dt_threshold = dt_threshold
+        self.dt_hold_blocks = dt_hold_blocks
+        self.warmup_blocks = warmup_blocks
+        self._adapted_blocks = 0
+        self.min_erle_db = min_erle_db
+        self.erle_smoothing = erle_smoothing
+        self._near_energy = 0.0
+        self._error_energy = 0.0
+        self.converged = False
+        bins = block + 1
+        self._weights = np.zeros((partitions, bins), dtype=np.complex128)
+        self._spectra = np.zeros((partitions, bins), dtype=np.complex128)  # newest reference block first
+        self._peaks = np.zeros(partitions)
+        self._previous = np.zeros(block)
+        self._power = np.zeros(bins)
+        self._power_blocks = 0
+        # Keeps the step size sane in bins where the reference has next to no energy.
+        self._regularization = 2 * block * noise_level ** 2
+        self._silent_blocks = partitions
+        self._hold = 0
+        self._zeros = np.zeros(block)
+        self.stats = collections.Counter()
+
+    @property
+    def erle(self):
+        """Recent echo return loss enhancement in dB on blocks where only Nova was playing."""
+        if self._near_energy <= 0.0:
+            return 0.0
+        return 10 * np.log10(self._near_energy / max(self._error_energy, 1e-9))
+
+    def cancel(self, frame, captured_at):
+        """Remove the echo of whatever the reference says was playing from a capture frame."""
+        return self.process(frame, self.reference.read(captured_at, len(frame)))
+
+    def process(self, near, far):
+        """near: captured int16 block, far: the reference block played at the same time. Returns int16."""
+        far_peak = float(np.max(np.abs(far))) if len(far) else 0.0
+        if far_peak == 0.0 and self._silent_blocks >= self.partitions:
+            self.stats["passthrough"] += 1
+            return near
+        self._silent_blocks = self._silent_blocks + 1 if far_peak == 0.0 else 0
+        block = self.block
+        far = np.asarray(far, dtype=np.float64)
+        near_f = near.astype(np.float64)
+
+        self._spectra = np.roll(self._spectra, 1, axis=0)
+        self._spectra[0] = np.fft.rfft(np.concatenate((self._previous, far)))
+        self._previous = far
+        self._peaks = np.roll(self._peaks, 1)
+        self._peaks[0] = far_peak
+
+        power = np.abs(self._spectra[0]) ** 2
+        if self._power_blocks < 1 / (1 - self.smoothing):
+            # Plain average until the smoothed estimate has enough history to lean on.
+            self._power_blocks += 1
+            self._power += (power - self._power) / self._power_blocks
+        else:
+            self._power = self.smoothing * self._power + (1 - self.smoothing) * power
+
+        echo = np.fft.irfft(np.einsum("pk,pk->k", self._weights, self._spectra), 2 * block)[block:]
+        error = near_f - echo
+
+        # Judged on the residual, so a loud echo path alone never looks like the user talking;
+        # that needs a roughly trained filter, hence no detection during warm-up.
+        warmed_up = self._adapted_blocks >= self.warmup_blocks
+        if warmed_up and np.max(np.abs(error)) > self.dt_threshold * self._peaks.max():
+            self._hold = self.dt_hold_blocks
+        if self._hold:
+            self._hold -= 1
+            self.stats["double_talk"] += 1
+        elif far_peak:
+            a = self.erle_smoothing
+            self._near_energy = a * self._near_energy + (1 - a) * float(np.dot(near_f, near_f))
+            self._error_energy = a * self._error_energy + (1 - a) * float(np.dot(error, error))
+            error_spectrum = np.fft.rfft(np.concatenate((self._zeros, error)))
+            # Every partition sees the same error, so split the step between them.
+            gradient = np.conj(self._spectra) * (error_spectrum / (self.partitions * self._power + self._regularization))
+            # Constrain each partition to block taps (the other half would wrap around).
+            taps = np.fft.irfft(gradient, 2 * block, axis=1)[:, :block]
+            self._weights += self.step * np.fft.rfft(taps, 2 * block, axis=1)
+            self._adapted_blocks += 1
+            self.stats["adapted"] += 1
+            if not self.converged and self._adapted_blocks >= self.warmup_blocks and self.erle >= self.min_erle_db:
+                self.converged = True
+        return np.clip(error, -32768, 32767).astype(np.int16)
+
+
+def erle_db(near, output):
+    """Echo return loss enhancement: how much quieter the output is than the captured echo."""
+    return 10 * np.log10(np.mean(near.astype(np.float64) ** 2) / max(np.mean(output.astype(np.float64) ** 2), 1e-9))
+
+
+def _speechlike(rng, n, sample_rate=SAMPLE_RATE):
+    """Coloured noise with a syllable-rate envelope and pauses; close enough to speech for an AEC."""
+    white = rng.normal(0, 1, n)
+    coloured = np.convolve(white, np.exp(-np.arange(40) / 8.0), mode="same")
+    t = np.arange(n) / sample_rate
+    envelope = np.clip(np.sin(2 * np.pi * 3.0 * t + rng.uniform(0, 6)), 0, None) ** 0.5
+    envelope *= (np.sin(2 * np.pi * 0.35 * t) > -0.6)  # short pauses between phrases
+    signal = coloured * envelope
+    return signal / np.max(np.abs(signal))
+
+
+def selftest(seconds=12, seed=3):
+    """Synthetic room: far-end through a decaying echo path, then double talk. Prints ERLE and CPU per frame."""
+    rng = np.random.default_rng(seed)
+    n = seconds * SAMPLE_RATE
+    far = (8000 * _speechlike(rng, n)).astype(np.int16)
+    # 20 ms bulk delay and a 100 ms exponentially decaying room response, about -8 dB overall.
+    path = np.zeros(int(0.12 * SAMPLE_RATE))
+    tail = rng.normal(0, 1, len(path) - 320) * np.exp(-np.arange(len(path) - 320) / (0.025 * SAMPLE_RATE))
+    path[320:] = tail / np.sqrt(np.sum(tail ** 2)) * 0.4
+    echo = np.convolve(far.astype(np.float64), path)[:n]
+    noise = rng.normal(0, 30, n)
+    near_talk = np.zeros(n)
+    dt_from = int(0.75 * n)  # the user talks over Nova for the last quarter
+    near_talk[dt_from:] = 6000 * _speechlike(rng, n - dt_from)
+    mic = np.clip(echo + noise + near_talk, -32768, 32767).astype(np.int16)
+
+    canceller = EchoCanceller()
+    out = np.zeros(n, dtype=np.int16)
+    costs = []
+    converged_at = None
+    for i in range(0, n - BLOCK + 1, BLOCK):
+        started = time.perf_counter()
+        out[i:i + BLOCK] = canceller.process(mic[i:i + BLOCK], far[i:i + BLOCK])
+        costs.append((time.perf_counter() - started) * 1000)
+        if converged_at is None and canceller.converged:
+            converged_at = (i + BLOCK) / SAMPLE_RATE
+
+    settle = 2 * SAMPLE_RATE
+    single = slice(settle, dt_from)
+    talk = slice(dt_from, n)
+    residual_echo = out[talk].astype(np.float64) - near_talk[talk] - noise[talk]
+    costs = np.array(costs)
+    print(f"ERLE, far end only (after {settle // SAMPLE_RATE}s): {erle_db(mic[single], out[single]):5.1f} dB")
+    print(f"ERLE during double talk (echo vs residual echo): "
+          f"{10 * np.log10(np.mean(echo[talk] ** 2) / np.mean(residual_echo ** 2)):5.1f} dB")
+    print(f"output vs microphone level during double talk: "
+          f"{10 * np.log10(np.mean(out[talk].astype(np.float64) ** 2) / np.mean(mic[talk].astype(np.float64) ** 2)):+.1f} dB")
+    print(f"CPU per {BLOCK * 1000 // SAMPLE_RATE} ms frame: mean {costs.mean():.3f} ms, "
+          f"p99 {np.percentile(costs, 99):.3f} ms ({costs.mean() / (BLOCK / SAMPLE_RATE * 1000) * 100:.1f}% of real time)")
+    print(f"converged after {converged_at:.1f}s" if converged_at is not None else "never converged")
+    print("blocks:", dict(canceller.stats))
+
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        selftest()
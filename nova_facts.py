@@ -0,0 +1,203 @@
+import concurrent.futures
+import json
+import os
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+CACHE_FILE = "nova_facts_cache.json"
+SOURCES_FILE = "nova_fact_sources.json"  # optional override of SOURCES, same shape
+TIMEOUT = (3.05, 10)  # (connect, read) seconds; a slow site gives up instead of stalling the refresh
+
+# Each source names the elements that hold one fact apiece; nothing else in the page is parsed.
+SOURCES = [
+    {"name": "ripleys", "url": "https://www.ripleys.com/weird-news/",
+     "tag": "h3", "class": "entry-title", "limit": 10},
+    {"name": "ancient_aliens", "url": "https://www.history.com/shows/ancient-aliens/season-1",
+     "tag": "h3", "class": "episode-title", "limit": 10},
+]
+
+
+def load_sources(path=SOURCES_FILE):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except OSError:
+        return SOURCES
+    except ValueError as e:
+        print(f"Ignoring malformed {path}:", e)
+        return SOURCES
+
+
+try:
+    import lxml  # noqa: F401  (only probed; BeautifulSoup loads it by name)
+    PARSER = "lxml"
+except ImportError:
+    PARSER = "html.parser"
+
+
+def parse_facts(html, tag, class_=None, limit=10):
+    """Text of the first limit <tag class=class_> elements; only those elements are built into a tree."""
+    from bs4 import BeautifulSoup, SoupStrainer
+    attrs = {"class_": class_} if class_ else {}
+    soup = BeautifulSoup(html, PARSER, parse_only=SoupStrainer(tag, **attrs))
+    facts = []
+    for element in soup.find_all(tag, limit=limit, **attrs):
+        text = element.get_text(" ", strip=True)
+        if text:
+            facts.append(text)
+    return facts
+
+
+class FactFetcher:
+    """Weird-fact scraper with a disk cache of the parsed facts.
+
+    cached_facts() is available immediately from the last run's cache.
+    refresh() fetches every source at once over one pooled session and
+    sends the stored ETag / Last-Modified back, so an unchanged page costs
+    a 304 and no parsing. A source that fails keeps its previous facts.
+    """
+
+    def __init__(self, sources=None, cache_path=CACHE_FILE, timeout=TIMEOUT):
+        self.sources = list(load_sources() if sources is None else sources)
+        self.cache_path = cache_path
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=len(self.sources) or 1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "Nova/1.0 (+weird facts)"
+        self._lock = threading.Lock()
+        self._cache = self._load()
+
+    def _load(self):
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        with self._lock:
+            payload = json.dumps(self._cache, indent=2)
+        tmp_path = self.cache_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.cache_path)
+
+    def cached_facts(self):
+        with self._lock:
+            entries = [self._cache.get(source["name"], {}) for source in self.sources]
+        facts = []
+        for entry in entries:
+            facts.extend(entry.get("facts", []))
+        return facts
+
+    def fetch(self, source):
+        """Refresh one source; returns (facts, status) where status is the HTTP code or an error string."""
+        with self._lock:
+            entry = dict(self._cache.get(source["name"], {}))
+        headers = {}
+        if entry.get("url") == source["url"]:
+            # Validators only mean something for the URL they came from.
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        try:
+            res = self.session.get(source["url"], headers=headers, timeout=self.timeout)
+            if res.status_code == 304:
+                entry["checked"] = time.time()
+                status = 304
+            else:
+                res.raise_for_status()
+                entry = {
+                    "url": source["url"],
+                    "etag": res.headers.get("ETag"),
+                    "last_modified": res.headers.get("Last-Modified"),
+                    "facts": parse_facts(res.content, source["tag"], source.get("class"), source.get("limit", 10)),
+                    "checked": time.time(),
+                }
+                status = res.status_code
+        except Exception as e:
+            print(f"{source['name']} scrape error:", e)
+            return entry.get("facts", []), type(e).__name__
+        with self._lock:
+            self._cache[source["name"]] = entry
+        return entry.get("facts", []), status
+
+    def refresh(self):
+        """Fetch all sources concurrently, persist the cache, and return every fact."""
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(self.sources) or 1) as pool:
+            results = list(pool.map(self.fetch, self.sources))
+        try:
+            self._save()
+        except OSError as e:
+            print("Fact cache write failed:", e)
+        summary = ", ".join(f"{s['name']}: {status}" for s, (_, status) in zip(self.sources, results))
+        print(f"Facts refreshed in {time.perf_counter() - started:.2f}s ({summary})")
+        return self.cached_facts()
+
+
+def _selftest():
+    """Stand-in sites on localhost, one slow: shows concurrency, the timeout, 304s and parse cost."""
+    import http.server
+    import tempfile
+
+    page = ("<html><body>" + "<p>filler</p>" * 2000 +
+            "".join(f"<h3 class='entry-title'>Weird fact {i}</h3>" for i in range(12)) + "</body></html>").encode()
+
+    class StandIn(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == "/slow":
+                time.sleep(2)
+            if self.headers.get("If-None-Match") == '"v1"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("ETag", '"v1"')
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            try:
+                self.wfile.write(page)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # the client timed out first, as intended for /slow
+
+        def log_message(self, format, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    sources = [{"name": "fast", "url": base + "/fast", "tag": "h3", "class": "entry-title", "limit": 10},
+               {"name": "medium", "url": base + "/medium", "tag": "h3", "class": "entry-title", "limit": 5},
+               {"name": "slow", "url": base + "/slow", "tag": "h3", "class": "entry-title", "limit": 10}]
+    cache_path = os.path.join(tempfile.mkdtemp(), CACHE_FILE)
+    from bs4 import BeautifulSoup
+    started = time.perf_counter()
+    BeautifulSoup(page, "html.parser").find_all("h3", class_="entry-title")
+    whole = time.perf_counter() - started
+    started = time.perf_counter()
+    parse_facts(page, "h3", "entry-title")
+    targeted = time.perf_counter() - started
+    print(f"parse: whole page with html.parser {whole * 1000:.1f} ms, targeted with {PARSER} {targeted * 1000:.1f} ms")
+    fetcher = FactFetcher(sources, cache_path=cache_path, timeout=(1, 1))
+    print("first refresh:", len(fetcher.refresh()), "facts (slow source times out)")
+    print("second refresh:", len(fetcher.refresh()), "facts (fast sources revalidate with 304)")
+    started = time.perf_counter()
+    reloaded = FactFetcher(sources, cache_path=cache_path).cached_facts()
+    print(f"startup from cache: {len(reloaded)} facts in {(time.perf_counter() - started) * 1000:.1f} ms")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        _selftest()
+    else:
+        for fact in FactFetcher().refresh():
+            print("-", fact)
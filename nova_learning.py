@@ -1,15 +1,455 @@
-from chatterbot import ChatBot
-from chatterbot.trainers import ChatterBotCorpusTrainer
+import collections
+import difflib
+import hashlib
+import json
+import os
+import queue
+import random
+import re
+import shutil
+import sqlite3
+import threading
+import time
 
-# Create a chatbot instance with real-time learning
-chatbot = ChatBot('NOVA', storage_adapter='chatterbot.storage.SQLStorageAdapter')
+CORPUS = 'chatterbot.corpus.english'
+TRAINING_VERSION = 1  # bump to force a retrain with new trainer settings
+BRAIN_DIR = "nova_brain"
+LIVE_DB = os.path.join(BRAIN_DIR, "nova_live.sqlite3")
+LIVE_MANIFEST = LIVE_DB + ".json"
+PERSONALITY_FILE = "nova_personality.json"
+FALLBACK_REPLIES = ["Hmm... curious, Captain."]
+
+RESPONSE_CACHE_SIZE = 512
+MIN_SIMILARITY = 0.5  # below this the closest known prompt is not close enough to answer with
+
+chatbot = None
+index = None
+_ready = threading.Event()
+_failed = threading.Event()  # set instead of _ready when the engine could not start
+_start_lock = threading.Lock()
+_starter = None
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def normalize(text):
+    return " ".join(re.findall(r"[a-z0-9']+", text.lower()))
+
+
+class StatementIndex:
+    """Inverted token index over known prompts (statements something was said in response to).
+
+    A query walks the posting lists of its rarest tokens first and stops once
+    scan_budget postings have been read, so only a short, token-overlap
+    ranked candidate list ever reaches the string-similarity scorer.
+    """
+
+    def __init__(self, max_candidates=20, scan_budget=2000):
+        self.max_candidates = max_candidates
+        self.scan_budget = scan_budget
+        self._prompts = []  # id -> normalized prompt
+        self._ids = {}
+        self._responses = []  # id -> list of response texts
+        self._postings = collections.defaultdict(list)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._prompts)
+
+    def add(self, text, in_response_to):
+        if not in_response_to:
+            return
+        prompt = normalize(in_response_to)
+        with self._lock:
+            prompt_id = self._ids.get(prompt)
+            if prompt_id is None:
+                prompt_id = len(self._prompts)
+                self._ids[prompt] = prompt_id
+                self._prompts.append(prompt)
+                self._responses.append([])
+                for token in set(prompt.split()):
+                    self._postings[token].append(prompt_id)
+            self._responses[prompt_id].append(text)
+
+    def candidates(self, normalized):
+        with self._lock:
+            postings = sorted((self._postings[t] for t in set(normalized.split()) if t in self._postings),
+                              key=len)
+            overlap = collections.Counter()
+            scanned = 0
+            for ids in postings:
+                if scanned and scanned + len(ids) > self.scan_budget:
+                    break
+                overlap.update(ids)
+                scanned += len(ids)
+        return [prompt_id for prompt_id, _ in overlap.most_common(self.max_candidates)]
+
+    def respond(self, text):
+        """Return (response, similarity) for the closest known prompt, or None."""
+        normalized = normalize(text)
+        exact = self._ids.get(normalized)
+        if exact is not None:
+            return self._responses[exact][0], 1.0
+        best_id, best_score = None, 0.0
+        matcher = difflib.SequenceMatcher(None, b=normalized)
+        for prompt_id in self.candidates(normalized):
+            matcher.set_seq1(self._prompts[prompt_id])
+            score = matcher.ratio()
+            if score > best_score:
+                best_id, best_score = prompt_id, score
+        if best_id is None or best_score < MIN_SIMILARITY:
+            return None
+        return self._responses[best_id][0], best_score
+
+
+class ResponseCache:
+    """Bounded LRU of normalized input -> response text; emptied whenever NOVA learns something."""
+
+    def __init__(self, capacity=RESPONSE_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+response_cache = ResponseCache()
+
+
+def _snapshot_id():
+    import chatterbot
+    key = json.dumps([CORPUS, TRAINING_VERSION, getattr(chatterbot, "__version__", "?")])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12]
+
+
+def _train_snapshot(db_path, manifest_path, snapshot_id):
+    """Train the corpus once into an immutable, checksummed database."""
+    from chatterbot import ChatBot
+    from chatterbot.trainers import ChatterBotCorpusTrainer
+
+    print(f"🧠 Training NOVA on {CORPUS} (first run for snapshot {snapshot_id})...")
+    tmp_path = db_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    trainee = ChatBot('NOVA', storage_adapter='chatterbot.storage.SQLStorageAdapter',
+                      database_uri='sqlite:///' + tmp_path)
+    ChatterBotCorpusTrainer(trainee).train(CORPUS)
+    trainee.storage.engine.dispose()
+    os.replace(tmp_path, db_path)
+    manifest = {"snapshot": snapshot_id, "corpus": CORPUS, "training_version": TRAINING_VERSION,
+                "sha256": _sha256(db_path), "size": os.path.getsize(db_path)}
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _statement_pairs(db_path):
+    connection = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    try:
+        return connection.execute(
+            "SELECT text, in_response_to FROM statement WHERE in_response_to IS NOT NULL ORDER BY id").fetchall()
+    finally:
+        connection.close()
+
+
+def _learned_rows(live_path, snapshot_path):
+    """(text, in_response_to) pairs the live database has beyond its snapshot, oldest first."""
+    remaining = collections.Counter(_statement_pairs(snapshot_path))
+    learned = []
+    for pair in _statement_pairs(live_path):
+        if remaining[pair]:
+            remaining[pair] -= 1
+        else:
+            learned.append(pair)
+    return learned
+
+
+def _store_rows(db_path, rows):
+    if not rows:
+        return
+    from chatterbot import ChatBot
+    target = ChatBot('NOVA', storage_adapter='chatterbot.storage.SQLStorageAdapter',
+                     database_uri='sqlite:///' + db_path)
+    for text, in_response_to in rows:
+        target.storage.create(text=text, in_response_to=in_response_to)
+    target.storage.engine.dispose()
+
+
+def _prepare_live_db():
+    """Make sure the live database descends from the current snapshot; train only if none exists."""
+    os.makedirs(BRAIN_DIR, exist_ok=True)
+    snapshot_id = _snapshot_id()
+    live = _read_json(LIVE_MANIFEST)
+    if live and live.get("snapshot") == snapshot_id and os.path.exists(LIVE_DB):
+        return  # the common case: nothing to verify, nothing to copy, nothing to train
+
+    db_path = os.path.join(BRAIN_DIR, f"snapshot-{snapshot_id}.sqlite3")
+    manifest_path = db_path + ".json"
+    manifest = _read_json(manifest_path)
+    if (not manifest or not os.path.exists(db_path)
+            or os.path.getsize(db_path) != manifest.get("size")
+            or _sha256(db_path) != manifest.get("sha256")):
+        manifest = _train_snapshot(db_path, manifest_path, snapshot_id)
+    shutil.copyfile(db_path, LIVE_DB + ".tmp")
+    if os.path.exists(LIVE_DB):
+        # A new snapshot must not cost what NOVA learned on the old one: keep a backup and
+        # carry the learned rows across.
+        old_snapshot = (live or {}).get("snapshot") or "unknown"
+        backup = os.path.join(BRAIN_DIR, f"nova_live.{old_snapshot}.sqlite3.bak")
+        shutil.copyfile(LIVE_DB, backup)
+        old_db = os.path.join(BRAIN_DIR, f"snapshot-{old_snapshot}.sqlite3")
+        rows = _learned_rows(LIVE_DB, old_db if os.path.exists(old_db) else db_path)
+        _store_rows(LIVE_DB + ".tmp", rows)
+        print(f"🧠 Snapshot changed ({old_snapshot} -> {snapshot_id}); carried {len(rows)} learned "
+              f"responses over, old live database kept as {backup}")
+    os.replace(LIVE_DB + ".tmp", LIVE_DB)
+    with open(LIVE_MANIFEST, "w") as f:
+        json.dump({"snapshot": snapshot_id, "sha256": manifest["sha256"]}, f, indent=2)
+
+
+def _start_engine():
+    global chatbot
+    try:
+        _prepare_live_db()
+        from chatterbot import ChatBot
+        # Create a chatbot instance on top of the trained snapshot. read_only keeps
+        # get_response() from storing its own guesses; learn() is the only writer.
+        chatbot = ChatBot('NOVA', storage_adapter='chatterbot.storage.SQLStorageAdapter',
+                          database_uri='sqlite:///' + LIVE_DB, read_only=True)
+        _ready.set()
+        print("🧠 NOVA learning engine ready.")
+        _build_index()
+    except Exception as e:
+        if not _ready.is_set():
+            _failed.set()
+        print("💥 Learning engine failed to start:", e)
+
+
+def _build_index():
+    global index
+    started = time.perf_counter()
+    built = StatementIndex()
+    for statement in chatbot.storage.filter():
+        built.add(statement.text, statement.in_response_to)
+    index = built
+    response_cache.clear()
+    print(f"🧠 Indexed {len(built)} prompts in {time.perf_counter() - started:.2f}s")
+
+
+def warm_start():
+    """Bring the ChatBot up on a background thread; safe to call repeatedly."""
+    global _starter
+    with _start_lock:
+        if _starter is None:
+            _starter = threading.Thread(target=_start_engine, daemon=True)
+            _starter.start()
+    return _starter
+
+
+def is_ready():
+    return _ready.is_set()
+
+
+def wait_ready(timeout=None):
+    """Block until the engine is up; False if it failed to start or timeout ran out."""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while not _ready.is_set() and not _failed.is_set():
+        remaining = None if deadline is None else deadline - time.monotonic()
+        if remaining is not None and remaining <= 0:
+            break
+        _ready.wait(0.5 if remaining is None else min(0.5, remaining))
+    return _ready.is_set()
+
+
+def canned_reply():
+    replies = (_read_json(PERSONALITY_FILE) or {}).get("default") or FALLBACK_REPLIES
+    return random.choice(replies)
 
-# Train NOVA using a corpus of conversational data
-trainer = ChatterBotCorpusTrainer(chatbot)
-trainer.train('chatterbot.corpus.english')
 
 # Allow NOVA to learn from the user in real-time
 def learn_from_user(input_text):
-    response = chatbot.get_response(input_text)
+    """Return NOVA's reply text; canned personality lines until the engine has warmed up."""
+    if not is_ready():
+        warm_start()
+        response = canned_reply()
+    elif index is None:
+        response = str(chatbot.get_response(input_text))
+    else:
+        response = known_response(input_text) or canned_reply()
     print(f"NOVA: {response}")
     return response
+
+
+def known_response(input_text):
+    """A learned reply for input_text from the cache or index, or None if there is none yet."""
+    if index is None:
+        return None
+    key = normalize(input_text)
+    response = response_cache.get(key)
+    if response is None:
+        hit = index.respond(input_text)
+        if hit is None:
+            return None
+        response = hit[0]
+        response_cache.put(key, response)
+    return response
+
+
+def learn(prompt, response):
+    """Store prompt -> response in the ChatBot and make it answerable straight away."""
+    from chatterbot.conversation import Statement
+    chatbot.learn_response(Statement(text=response), prompt)
+    if index is not None:
+        index.add(response, prompt)
+    response_cache.clear()
+
+
+class LearningQueue:
+    """Background worker that turns unknown inputs into things NOVA can answer.
+
+    Inputs are deduplicated by normalized text and handled in batches. Each
+    one is first offered to attach(text), which can link it to a nearby
+    taught trigger; otherwise the ChatBot's reply is learned as an
+    incremental prompt -> response pair. Nothing is retrained, so the cost
+    tracks the new inputs only. The queue is bounded: submit() never blocks
+    the caller and returns False (counted as dropped) when the worker is
+    behind.
+    """
+
+    def __init__(self, attach=None, maxsize=256, batch_size=16, seen_limit=10000):
+        self.attach = attach
+        self.batch_size = batch_size
+        self.seen_limit = seen_limit
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._seen = collections.OrderedDict()
+        self._worker = None
+        self._last_lag = 0.0
+        self.stats = collections.Counter()
+
+    def start(self):
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, daemon=True)
+            self._worker.start()
+        return self
+
+    def submit(self, text):
+        try:
+            self._queue.put_nowait((time.monotonic(), text))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["submitted"] += 1
+        return True
+
+    def progress(self):
+        """Counters plus lag: items waiting and how long the last batch's oldest item waited."""
+        return dict(self.stats, pending=self._queue.qsize(), lag_seconds=round(self._last_lag, 3))
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._last_lag = time.monotonic() - batch[0][0]
+            try:
+                self._process(batch)
+            except Exception as e:
+                self.stats["failed"] += len(batch)
+                print("💥 Learning batch failed:", e)
+
+    def _process(self, batch):
+        fresh = []
+        for _, text in batch:
+            key = normalize(text)
+            if not key or key in self._seen:
+                self.stats["duplicates"] += 1
+                continue
+            self._seen[key] = True
+            if len(self._seen) > self.seen_limit:
+                self._seen.popitem(last=False)
+            fresh.append(text)
+        for text in fresh:
+            if self.attach is not None and self.attach(text):
+                self.stats["attached"] += 1
+                continue
+            warm_start()
+            if not wait_ready():
+                # No ChatBot to learn with; attach() above still works for every input.
+                self.stats["skipped"] += 1
+                continue
+            response = known_response(text) or str(chatbot.get_response(text))
+            learn(text, response)
+            self.stats["trained"] += 1
+        if fresh:
+            print("🧠 Learning progress:", self.progress())
+
+
+def benchmark(counts=(1000, 10000, 100000), queries=500, seed=7):
+    """p50/p99 of index-backed lookups as the number of stored prompts grows."""
+    rng = random.Random(seed)
+    vocabulary = [f"w{i}" for i in range(5000)]
+    results = []
+    for count in counts:
+        bench_index = StatementIndex()
+        prompts = []
+        for i in range(count):
+            prompt = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(3, 9)))
+            prompts.append(prompt)
+            bench_index.add(f"reply {i}", prompt)
+        timings = []
+        for _ in range(queries):
+            words = rng.choice(prompts).split()
+            words[rng.randrange(len(words))] = rng.choice(vocabulary)  # near miss, not exact
+            started = time.perf_counter()
+            bench_index.respond(" ".join(words))
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        results.append({"statements": count,
+                        "p50_ms": timings[len(timings) // 2],
+                        "p99_ms": timings[min(len(timings) - 1, int(len(timings) * 0.99))]})
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+    if "--bench" in sys.argv:
+        for row in benchmark():
+            print("{statements:>8} statements  p50 {p50_ms:7.3f} ms  p99 {p99_ms:7.3f} ms".format(**row))
@@ -0,0 +1,319 @@
+import difflib
+import re
+import zlib
+from collections import deque
+
+import numpy as np
+
+
+# Words that can go missing or change without changing what was asked ("what's" -> "what", "s").
+FUNCTION_WORDS = frozenset(
+    "a an the is are am was were be been do does did to of for at by with from about and or but so "
+    "me my i it its this that these those there what whats how please can could would will just some "
+    "s t d ll re ve m".split())
+SHORTHAND = {"u": "you", "r": "are", "ur": "your", "ya": "you", "pls": "please", "plz": "please"}
+WORD_SIMILARITY = 0.75  # difflib ratio at which two words count as the same one misspelled or misheard
+
+
+def _words(text):
+    return [SHORTHAND.get(w, w) for w in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+def _same_word(a, b):
+    if a == b:
+        return True
+    if min(len(a), len(b)) >= 3 and (a in b or b in a):
+        return True  # "goodnight" / "good", "lights" / "light"
+    return difflib.SequenceMatcher(None, a, b).ratio() >= WORD_SIMILARITY
+
+
+def covers(text, trigger):
+    """True when every content word of each side has a counterpart among the other side's words.
+
+    Character n-grams alone score "tell me a story" close to "tell me a
+    joke" on a short trigger; this is the check that the words that carry
+    the meaning agree, while misspellings, joined words and function words
+    still may not.
+    """
+    text_words, trigger_words = _words(text), _words(trigger)
+    for words, others in ((trigger_words, text_words), (text_words, trigger_words)):
+        for word in words:
+            if word not in FUNCTION_WORDS and not any(_same_word(word, other) for other in others):
+                return False
+    return True
+
+
+class TriggerIndex:
+    """Aho-Corasick automaton over taught trigger phrases.
+
+    match() walks the lowercased utterance once, however many triggers are
+    known. When several triggers occur, the longest wins and ties go to the
+    one that starts earliest, so the answer never depends on teaching order.
+    add() extends the trie in place; failure links are rebuilt lazily on the
+    next match, so a burst of teaching costs one rebuild. remove() does the
+    same, leaving the trigger's states in the trie with nothing ending there.
+    """
+
+    def __init__(self, triggers=()):
+        self._goto = [{}]    # state -> {char: next state}
+        self._fail = [0]
+        self._terminal = [None]  # trigger that ends exactly at this state
+        self._best = [None]  # longest trigger ending here, following failure links
+        self._values = {}
+        self._dirty = False
+        for trigger, value in dict(triggers).items():
+            self.add(trigger, value)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __contains__(self, trigger):
+        return trigger.lower() in self._values
+
+    def add(self, trigger, value):
+        trigger = trigger.lower()
+        if not trigger:
+            return
+        if trigger in self._values:
+            self._values[trigger] = value
+            return
+        self._values[trigger] = value
+        state = 0
+        for char in trigger:
+            nxt = self._goto[state].get(char)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(None)
+                self._best.append(None)
+                self._goto[state][char] = nxt
+            state = nxt
+        self._terminal[state] = trigger
+        self._dirty = True
+
+    def remove(self, trigger):
+        trigger = trigger.lower()
+        if trigger not in self._values:
+            return False
+        del self._values[trigger]
+        state = 0
+        for char in trigger:
+            state = self._goto[state][char]
+        self._terminal[state] = None
+        self._dirty = True
+        return True
+
+    def _build(self):
+        queue = deque()
+        for state in self._goto[0].values():
+            self._fail[state] = 0
+            self._best[state] = self._terminal[state]
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(char, 0)
+                # Any trigger ending here is at least as long as one reached through the failure link.
+                self._best[nxt] = self._terminal[nxt] or self._best[self._fail[nxt]]
+                queue.append(nxt)
+        self._dirty = False
+
+    def match(self, text):
+        """Return (trigger, value) for the highest-priority trigger found in text, or None."""
+        if self._dirty:
+            self._build()
+        goto, fail, best = self._goto, self._fail, self._best
+        state = 0
+        found, found_start = None, 0
+        for i, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            trigger = best[state]
+            if trigger is not None:
+                start = i - len(trigger) + 1
+                if found is None or len(trigger) > len(found) or (
+                        len(trigger) == len(found) and start < found_start):
+                    found, found_start = trigger, start
+        if found is None:
+            return None
+        return found, self._values[found]
+
+
+class FuzzyTriggerIndex:
+    """Character n-gram TF-IDF over taught triggers for near-miss utterances.
+
+    N-grams are hashed into a fixed number of buckets. Weights are kept
+    transposed (buckets x triggers, float32) so a query touches only the
+    rows of the buckets it actually contains: scoring is one product of
+    that slice with the query's weights. New triggers get a column
+    weighted with the current IDF; every trigger is re-weighted only once
+    the collection has grown by reweight_growth since the last time.
+
+    best() is what answers a near miss: the top trigger has to reach the
+    threshold, beat the runner-up by margin (unless both give the same
+    reply) and pass covers(), so a shared "what is your" is not enough.
+
+    The matrix is dense, dims x capacity float32 plus uint8 counts (about
+    84 MB at 30k triggers), and a query reads every trigger's column in the
+    buckets it touches: around 1 ms at 20-30k triggers, 2 ms at 50k.
+    """
+
+    def __init__(self, triggers=(), ngram=3, dims=512, threshold=0.55, margin=0.1,
+                 capacity=256, reweight_growth=0.1):
+        self.ngram = ngram
+        self.dims = dims
+        self.threshold = threshold
+        self.margin = margin
+        self.reweight_growth = reweight_growth
+        self._counts = np.zeros((dims, capacity), dtype=np.uint8)
+        self._weights = np.zeros((dims, capacity), dtype=np.float32)
+        self._df = np.zeros(dims, dtype=np.float32)
+        self._idf = np.ones(dims, dtype=np.float32)
+        self._weighted_at = 0
+        self._triggers = []
+        self._values = []
+        self._positions = {}
+        for trigger, value in dict(triggers).items():
+            self.add(trigger, value)
+
+    def __len__(self):
+        return len(self._triggers)
+
+    def _features(self, text):
+        text = " " + re.sub(r"\s+", " ", text.lower()).strip() + " "
+        n = self.ngram
+        grams = [text[i:i + n] for i in range(max(1, len(text) - n + 1))]
+        buckets = np.fromiter((zlib.crc32(g.encode("utf-8")) % self.dims for g in grams),
+                              dtype=np.int64, count=len(grams))
+        return np.unique(buckets, return_counts=True)
+
+    def _grow(self):
+        capacity = self._counts.shape[1] * 2
+        counts = np.zeros((self.dims, capacity), dtype=np.uint8)
+        weights = np.zeros((self.dims, capacity), dtype=np.float32)
+        counts[:, :len(self)] = self._counts[:, :len(self)]
+        weights[:, :len(self)] = self._weights[:, :len(self)]
+        self._counts, self._weights = counts, weights
+
+    def _reweight(self):
+        n = len(self)
+        self._idf = (np.log((1.0 + n) / (1.0 + self._df)) + 1.0).astype(np.float32)
+        weighted = self._counts[:, :n] * self._idf[:, None]
+        norms = np.linalg.norm(weighted, axis=0)
+        norms[norms == 0] = 1.0
+        self._weights[:, :n] = weighted / norms
+        self._weighted_at = n
+
+    def add(self, trigger, value):
+        trigger = trigger.lower()
+        if not trigger:
+            return
+        position = self._positions.get(trigger)
+        if position is not None:
+            self._values[position] = value
+            return
+        if len(self) == self._counts.shape[1]:
+            self._grow()
+        buckets, counts = self._features(trigger)
+        column = len(self)
+        self._counts[buckets, column] = np.minimum(counts, 255)
+        self._df[buckets] += 1
+        self._positions[trigger] = column
+        self._triggers.append(trigger)
+        self._values.append(value)
+        if len(self) > self._weighted_at * (1 + self.reweight_growth):
+            self._reweight()
+        else:
+            weighted = counts.astype(np.float32) * self._idf[buckets]
+            self._weights[buckets, column] = weighted / np.linalg.norm(weighted)
+
+    def query(self, text, k=3, threshold=None):
+        """Top-k (trigger, value, score) by cosine similarity, best first, at or above the threshold."""
+        threshold = self.threshold if threshold is None else threshold
+        n = len(self)
+        if n == 0:
+            return []
+        buckets, counts = self._features(text)
+        query = counts.astype(np.float32) * self._idf[buckets]
+        query /= np.linalg.norm(query)
+        scores = query @ self._weights[buckets, :n]
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self._triggers[i], self._values[i], float(scores[i]))
+                for i in top if scores[i] >= threshold]
+
+    def best(self, text, threshold=None, margin=None):
+        """The (trigger, value, score) text is a near miss of, or None when no trigger is clearly it."""
+        margin = self.margin if margin is None else margin
+        hits = self.query(text, k=2, threshold=0.0)
+        if not hits or hits[0][2] < (self.threshold if threshold is None else threshold):
+            return None
+        if len(hits) > 1 and hits[0][2] - hits[1][2] < margin and hits[0][1] != hits[1][1]:
+            return None
+        return hits[0] if covers(text, hits[0][0]) else None
+
+
+# Near misses that should be answered, and questions that merely look like a taught trigger.
+SELFTEST_TRIGGERS = {
+    "what is your name": "I'm Nova.",
+    "tell me a joke": "joke",
+    "how old are you": "age",
+    "good night": "night",
+    "how are you": "fine",
+    "what is the capital of france": "Paris",
+    "turn off the lights": "lights off",
+}
+SELFTEST_NEAR = {
+    "how old r you": "how old are you",
+    "how old are u": "how old are you",
+    "whats your name": "what is your name",
+    "what's your name": "what is your name",
+    "what is you name": "what is your name",
+    "tell me a jok": "tell me a joke",
+    "tel me a joke": "tell me a joke",
+    "tell me joke": "tell me a joke",
+    "goodnight": "good night",
+    "whats the capital of france": "what is the capital of france",
+    "what is the capital of frace": "what is the capital of france",
+    "turn of the lights": "turn off the lights",
+    "turn off the light": "turn off the lights",
+}
+SELFTEST_UNRELATED = [
+    "what is your favorite food", "what is your quest", "what is your job", "what is the time",
+    "tell me a story", "tell me about you", "how old is your cat", "how old is the moon",
+    "how old is he", "how are they", "what is the capital of spain", "turn on the lights",
+    "turn off the tv", "good morning",
+]
+
+
+def selftest(filler=1000, seed=0):
+    """Near misses among filler triggers must find their trigger and unrelated questions nothing; exits 1 if not."""
+    import random
+    import sys
+    rng = random.Random(seed)
+    triggers = dict(SELFTEST_TRIGGERS)
+    for i in range(filler):
+        triggers[" ".join(f"w{rng.randrange(2000)}" for _ in range(rng.randint(2, 5)))] = f"filler {i}"
+    index = FuzzyTriggerIndex(triggers)
+    failures = 0
+    for text, expected in list(SELFTEST_NEAR.items()) + [(text, None) for text in SELFTEST_UNRELATED]:
+        hit = index.best(text)
+        got = hit[0] if hit else None
+        top = index.query(text, k=1, threshold=0.0)[0]
+        ok = got == expected
+        failures += not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {text!r:34} -> {got!r} (closest {top[0]!r} {top[2]:.2f})")
+    print(f"{failures} failures")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        selftest()
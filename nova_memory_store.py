@@ -0,0 +1,312 @@
+import copy
+import json
+import os
+import queue
+import threading
+import time
+
+import nova_trace
+
+
+class MemoryStore:
+    """nova_memory.json as a snapshot plus an append-only journal of the changes made since.
+
+    Mutations update the in-memory dict immediately and queue a one-line
+    journal record; a background writer batches those records, appends them
+    with a single fsync per batch, and every compact_every records rewrites
+    the snapshot atomically and starts a fresh journal. Every record carries
+    a sequence number and the snapshot remembers the last one it contains,
+    so replay after a crash never applies a change twice.
+
+    Lists named in history_keys only keep their newest hot_window entries in
+    memory and in the snapshot; older entries are moved to a per-key archive
+    file and paged back in by history() when someone asks for them.
+    """
+
+    def __init__(self, path, defaults, flush_interval=0.5, compact_every=500,
+                 history_keys=(), hot_window=200):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.defaults = defaults
+        self.history_keys = set(history_keys)
+        self.hot_window = hot_window
+        self.flush_interval = flush_interval
+        self.compact_every = compact_every
+        self.data = None
+        self._seq = 0
+        self._journaled = 0  # records in the current journal file
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._writer = None
+        self._journal = None
+        self._archives = {}  # key -> open append handle
+
+    # --- loading -----------------------------------------------------------
+
+    def load(self):
+        data = {}
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    data = json.load(f)
+                print("Memory loaded successfully.")
+            except Exception as e:
+                print("Failed to load memory:", e)
+        else:
+            print("No memory file found; starting fresh.")
+        self._seq = data.pop("_journal_seq", 0)
+        for key, value in self.defaults.items():
+            data.setdefault(key, copy.deepcopy(value))
+        self.data = data
+        replayed = self._replay()
+        if replayed:
+            print(f"Replayed {replayed} journaled memory changes.")
+        # A memory file from before the hot window existed may hold the full transcript.
+        overflow = {key: self._trim(key) for key in self.history_keys}
+        if any(overflow.values()):
+            for key, values in overflow.items():
+                if values:
+                    self._write_archive([{"key": key, "values": values, "t": time.time()}])
+            self._compact()
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        self._writer = threading.Thread(target=self._write_loop, daemon=True)
+        self._writer.start()
+        return self.data
+
+    def _replay(self):
+        if not os.path.exists(self.journal_path):
+            return 0
+        replayed = 0
+        valid_bytes = 0
+        with open(self.journal_path, "rb") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # torn final write from a crash
+                valid_bytes += len(line)
+                self._journaled += 1
+                if record["seq"] <= self._seq:
+                    continue
+                self._apply(record)
+                self._trim(record["key"])  # the trimmed entries were archived the first time round
+                self._seq = record["seq"]
+                replayed += 1
+        if valid_bytes < os.path.getsize(self.journal_path):
+            # Drop the torn tail so new records are not appended after garbage.
+            os.truncate(self.journal_path, valid_bytes)
+        return replayed
+
+    def _apply(self, record):
+        op, key = record["op"], record["key"]
+        if op == "append":
+            self.data.setdefault(key, []).append(record["value"])
+        elif op == "set":
+            self.data.setdefault(key, {})[record["field"]] = record["value"]
+        elif op == "delete":
+            self.data.get(key, {}).pop(record["field"], None)
+
+    def _trim(self, key):
+        """Cut a history list back to the hot window; returns what was cut."""
+        if key not in self.history_keys:
+            return []
+        values = self.data.get(key, [])
+        excess = len(values) - self.hot_window
+        if excess <= 0:
+            return []
+        evicted = values[:excess]
+        del values[:excess]
+        return evicted
+
+    # --- mutations ---------------------------------------------------------
+
+    def _record(self, record):
+        with self._lock:
+            self._seq += 1
+            record["seq"] = self._seq
+            self._apply(record)
+            evicted = self._trim(record["key"])
+            if evicted:
+                # Queued first so the archive is durable before the journal record that implies it.
+                self._queue.put({"op": "archive", "key": record["key"], "values": evicted, "t": time.time()})
+            self._queue.put(record)
+
+    def append(self, key, value):
+        self._record({"op": "append", "key": key, "value": value})
+
+    def set_item(self, key, field, value):
+        self._record({"op": "set", "key": key, "field": field, "value": value})
+
+    def delete_item(self, key, field):
+        self._record({"op": "delete", "key": key, "field": field})
+
+    # --- background writer -------------------------------------------------
+
+    def _write_loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            # Debounce: keep collecting until the window closes or someone is waiting on a flush.
+            while isinstance(batch[-1], dict):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            archives = [item for item in batch if isinstance(item, dict) and item["op"] == "archive"]
+            records = [item for item in batch if isinstance(item, dict) and item["op"] != "archive"]
+            requests = [item for item in batch if not isinstance(item, dict)]
+            try:
+                if archives:
+                    with nova_trace.span("memory.archive", entries=sum(len(a["values"]) for a in archives)):
+                        self._write_archive(archives)
+                if records:
+                    with nova_trace.span("memory.journal", records=len(records)):
+                        self._journal.write("".join(json.dumps(r) + "\n" for r in records))
+                        self._journal.flush()
+                        os.fsync(self._journal.fileno())
+                    self._journaled += len(records)
+                if self._journaled >= self.compact_every:
+                    self._compact()
+                for _, action in requests:
+                    if action is not None:
+                        action()
+            except Exception as e:
+                print("Failed to save memory:", e)
+                nova_trace.incr("memory.write_errors")
+            for done, _ in requests:
+                done.set()
+
+    def _archive_path(self, key):
+        return f"{os.path.splitext(self.path)[0]}.{key}.archive.jsonl"
+
+    def _write_archive(self, archives):
+        touched = set()
+        for item in archives:
+            handle = self._archives.get(item["key"])
+            if handle is None:
+                handle = open(self._archive_path(item["key"]), "a", encoding="utf-8")
+                self._archives[item["key"]] = handle
+            handle.write("".join(json.dumps({"t": item["t"], "v": v}) + "\n" for v in item["values"]))
+            touched.add(handle)
+        for handle in touched:
+            handle.flush()
+            os.fsync(handle.fileno())
+
+    def _compact(self):
+        with nova_trace.span("memory.compact"):
+            self._write_snapshot()
+        print("Memory saved.")
+
+    def _write_snapshot(self):
+        with self._lock:
+            snapshot = dict(self.data, _journal_seq=self._seq)
+            payload = json.dumps(snapshot, indent=2)
+            pending = self._drain_queue()
+        # Entries trimmed out of the snapshot must be archived before it replaces the old one,
+        # or a crash right after would leave them nowhere (their journal records get skipped).
+        archives = [item for item in pending if isinstance(item, dict) and item["op"] == "archive"]
+        if archives:
+            self._write_archive(archives)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        if self._journal is not None:
+            self._journal.close()
+        self._journal = open(self.journal_path, "w", encoding="utf-8")
+        self._journaled = 0
+
+    def _drain_queue(self):
+        """Take everything queued; journal records are dropped (the snapshot covers them), flush requests go back."""
+        pending = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for item in pending:
+            if not isinstance(item, dict):
+                self._queue.put(item)
+        return pending
+
+    def _run_on_writer(self, action, timeout):
+        done = threading.Event()
+        self._queue.put((done, action))
+        return done.wait(timeout)
+
+    def flush(self, timeout=None):
+        """Block until everything recorded so far is on disk."""
+        return self._run_on_writer(None, timeout)
+
+    def compact(self, timeout=None):
+        """Write a fresh snapshot now (e.g. before shutdown)."""
+        return self._run_on_writer(self._compact, timeout)
+
+    # --- cold history ------------------------------------------------------
+
+    def history(self, key, count=50, offset=0):
+        """Return up to count entries, oldest first, ending offset entries back from the newest.
+
+        The hot window is served from memory; only requests that reach past it
+        read the archive, and then only as much of its tail as is needed.
+        """
+        with self._lock:
+            hot = list(self.data.get(key, []))
+        end = len(hot) - offset
+        if end >= count:
+            return hot[end - count:end]
+        older = self._read_archive_tail(key, skip=max(0, -end), count=count - max(0, end))
+        return older + hot[:max(0, end)]
+
+    def _read_archive_tail(self, key, skip, count, block_size=64 * 1024):
+        self.flush()
+        path = self._archive_path(key)
+        if count <= 0 or not os.path.exists(path):
+            return []
+        wanted = skip + count
+        lines = []
+        with open(path, "rb") as f:
+            position = f.seek(0, os.SEEK_END)
+            remainder = b""
+            while position > 0 and len(lines) < wanted:
+                step = min(block_size, position)
+                position -= step
+                f.seek(position)
+                chunk = f.read(step) + remainder
+                parts = chunk.split(b"\n")
+                remainder = parts[0]
+                lines.extend(reversed([p for p in parts[1:] if p]))
+            if position == 0 and remainder:
+                lines.append(remainder)
+        picked = lines[skip:wanted]
+        return [json.loads(line)["v"] for line in reversed(picked)]
+
+    def compact_history(self, key, max_entries=None, max_age=None, timeout=None):
+        """Drop archived entries beyond the newest max_entries or older than max_age seconds."""
+        def run():
+            path = self._archive_path(key)
+            if not os.path.exists(path):
+                return
+            handle = self._archives.pop(key, None)
+            if handle is not None:
+                handle.close()
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+            if max_age is not None:
+                cutoff = time.time() - max_age
+                lines = [line for line in lines if json.loads(line)["t"] >= cutoff]
+            if max_entries is not None:
+                lines = lines[-max_entries:] if max_entries else []
+            tmp_path = path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.writelines(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+            print(f"Archived {key} compacted to {len(lines)} entries.")
+        return self._run_on_writer(run, timeout)
@@ -1,8 +1,48 @@
+import os
+import threading
+import time
 import tkinter as tk
 from PIL import Image, ImageTk
 
+import nova_trace
+
+OVERLAY_HEIGHT = 240
+FRAME_RATE = 30          # cap on overlay redraws per second
+MOUTH_CENTER = (0.5, 0.78)  # mouth position as a fraction of the sprite size
+MOUTH_LEVELS = 8         # amplitude quantization; unchanged levels are not redrawn
+# Named visuals the rest of Nova can switch between: name -> (source image, target height)
+SPRITES = {
+    "idle": ("TheNova.png", OVERLAY_HEIGHT),
+    "speaking": ("TheNova.png", OVERLAY_HEIGHT),
+}
+
+class SpriteCache:
+    """Decoded, resized PhotoImages keyed by (path, height), rebuilt only when the source changes."""
+
+    def __init__(self):
+        self._entries = {}  # (path, height) -> (source mtime, PhotoImage)
+
+    def get(self, image_path, target_height=None):
+        key = (image_path, target_height)
+        mtime = os.path.getmtime(image_path)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == mtime:
+            return entry[1]
+        image = Image.open(image_path)
+        if target_height:
+            width, height = image.size
+            scale_factor = target_height / height
+            image = image.resize((int(width * scale_factor), target_height))
+        photo = ImageTk.PhotoImage(image)
+        self._entries[key] = (mtime, photo)
+        return photo
+
+    def preload(self, sprites):
+        for image_path, target_height in sprites.values():
+            self.get(image_path, target_height)
+
 class NovaOverlay:
-    def __init__(self, image_path="resized_overlay.png"):
+    def __init__(self, image_path=SPRITES["idle"][0], target_height=OVERLAY_HEIGHT):
         self.root = tk.Tk()
         self.root.title("Nova Overlay")
         self.root.overrideredirect(True)  # No window borders
@@ -13,9 +53,10 @@ class NovaOverlay:
         self.canvas = tk.Canvas(self.root, bg="white", highlightthickness=0)
         self.canvas.pack(fill="both", expand=True)
         
-        # Load and display the image
-        self.image = Image.open(image_path)
-        self.tk_image = ImageTk.PhotoImage(self.image)
+        # Decode every known sprite up front (on the Tk thread) so later swaps never touch disk.
+        self.sprites = SpriteCache()
+        self.sprites.preload(SPRITES)
+        self.tk_image = self.sprites.get(image_path, target_height)
         self.image_id = self.canvas.create_image(0, 0, anchor="nw", image=self.tk_image)
         
         # Make the window draggable by binding mouse events to the canvas.
@@ -24,8 +65,23 @@ class NovaOverlay:
         self.canvas.bind("<Button-1>", self.start_move)
         self.canvas.bind("<B1-Motion>", self.do_move)
         
+        # Lip-sync mouth, drawn over the sprite and hidden while idle.
+        self.mouth_id = self.canvas.create_oval(0, 0, 0, 0, fill="#3a1f1f", outline="", state="hidden")
+        self._mouth_level = None
+        self._envelope = None  # (amplitudes, frames per second, playback start)
+        
+        # Worker threads never change Tk state themselves: they post commands that the
+        # Tk loop drains on the next frame. Only the newest command of each kind is kept.
+        # Frames are only scheduled while there is something to apply or animate.
+        # Scheduling the first one is the single Tk call made from a worker (root.after);
+        # see post() for what that relies on.
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._drain_scheduled = False
+        self._frame_ms = max(1, 1000 // FRAME_RATE)
+        
         # Set initial geometry; adjust width and height as needed.
-        self.root.geometry(f"{self.image.width()}x{self.image.height()}+100+100")
+        self.root.geometry(f"{self.tk_image.width()}x{self.tk_image.height()}+100+100")
     
     def start_move(self, event):
         self.offset_x = event.x
@@ -36,38 +92,127 @@ class NovaOverlay:
         y = self.root.winfo_pointery() - self.offset_y
         self.root.geometry(f"+{x}+{y}")
 
-    def update_image(self, image_path):
-        # Reload image and update the canvas
-        self.image = Image.open(image_path)
-        self.tk_image = ImageTk.PhotoImage(self.image)
+    def update_image(self, image_path, target_height=None):
+        # Swap in the cached image; only decodes if this source/size is new or changed on disk
+        tk_image = self.sprites.get(image_path, target_height)
+        if tk_image is self.tk_image:
+            return
+        resized = (tk_image.width(), tk_image.height()) != (self.tk_image.width(), self.tk_image.height())
+        self.tk_image = tk_image
         self.canvas.itemconfig(self.image_id, image=self.tk_image)
         # Update geometry if image size has changed
-        self.root.geometry(f"{self.image.width()}x{self.image.height()}")
+        if resized:
+            self.root.geometry(f"{self.tk_image.width()}x{self.tk_image.height()}")
+
+    def show_sprite(self, name):
+        self.update_image(*SPRITES[name])
 
     def set_speaking(self, state):
+        self.show_sprite("speaking" if state else "idle")
         # Optionally change the background color when speaking
         if state:
             self.canvas.config(bg="lightblue")
         else:
             self.canvas.config(bg="white")
+        if not state:
+            self._envelope = None
         print("Overlay set speaking:", state)
 
+    def start_lipsync(self, envelope, frame_rate, started_at):
+        self._envelope = (envelope, frame_rate, started_at)
+
+    def post(self, kind, *args):
+        """Queue a mutation from any thread; applied on the next frame, replacing an older one of the same kind.
+
+        The after() that wakes the Tk loop is called from the posting thread.
+        That is only safe with a threaded Tcl (what python.org and distro
+        builds ship), where tkinter hands the call to the Tk thread and waits
+        for it. Without a running main loop (before launch, or at shutdown)
+        it raises instead; the command is then dropped, since there is no
+        window left to apply it to.
+        """
+        with self._pending_lock:
+            self._pending[kind] = args
+            if self._drain_scheduled:
+                return
+            self._drain_scheduled = True
+        try:
+            self.root.after(self._frame_ms, self._drain)
+        except (RuntimeError, tk.TclError):
+            with self._pending_lock:
+                self._pending.clear()
+                self._drain_scheduled = False
+
+    def _drain(self):
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+        animating = False
+        try:
+            if pending:
+                with nova_trace.span("overlay.update", commands=",".join(pending)):
+                    for kind, args in pending.items():
+                        getattr(self, kind)(*args)
+            animating = self._draw_mouth()
+        except Exception as e:
+            print("Overlay render error:", e)
+        with self._pending_lock:
+            self._drain_scheduled = animating or bool(self._pending)
+            if not self._drain_scheduled:
+                return
+        self.root.after(self._frame_ms, self._drain)
+
+    def _draw_mouth(self):
+        """Draw the mouth for the current envelope frame; True while the envelope still has frames to show."""
+        level = 0
+        animating = False
+        if self._envelope is not None:
+            envelope, frame_rate, started_at = self._envelope
+            index = int((time.monotonic() - started_at) * frame_rate)
+            animating = index < len(envelope)
+            if 0 <= index < len(envelope):
+                level = int(round(float(envelope[index]) * MOUTH_LEVELS))
+        if level == self._mouth_level:
+            return animating
+        self._mouth_level = level
+        if level == 0:
+            self.canvas.itemconfig(self.mouth_id, state="hidden")
+            return animating
+        width, height = self.tk_image.width(), self.tk_image.height()
+        cx, cy = width * MOUTH_CENTER[0], height * MOUTH_CENTER[1]
+        half_w = width * 0.08
+        half_h = max(1.0, height * 0.04 * level / MOUTH_LEVELS)
+        self.canvas.coords(self.mouth_id, cx - half_w, cy - half_h, cx + half_w, cy + half_h)
+        self.canvas.itemconfig(self.mouth_id, state="normal")
+        return animating
+
     def launch_overlay(self):
         self.root.mainloop()
 
 # Global instance for external access
 _overlay_instance = None
 
-def launch_overlay():
+def launch_overlay(on_ready=None):
+    """Create the overlay and run the Tk loop; on_ready runs once the window is up."""
     global _overlay_instance
-    _overlay_instance = NovaOverlay("resized_overlay.png")
+    _overlay_instance = NovaOverlay()
+    if on_ready is not None:
+        _overlay_instance.root.after_idle(on_ready)
     _overlay_instance.launch_overlay()
 
 def set_speaking(state):
     if _overlay_instance:
-        _overlay_instance.set_speaking(state)
+        _overlay_instance.post("set_speaking", state)
     else:
         print("No overlay instance available to set speaking state.")
 
+def show_sprite(name):
+    if _overlay_instance:
+        _overlay_instance.post("show_sprite", name)
+
+def start_lipsync(envelope, frame_rate=FRAME_RATE):
+    """Animate the mouth from a precomputed 0..1 envelope, clocked from now (playback start)."""
+    if _overlay_instance:
+        _overlay_instance.post("start_lipsync", envelope, frame_rate, time.monotonic())
+
 def get_overlay_instance():
     return _overlay_instance
@@ -0,0 +1,124 @@
+import math
+import time
+
+import numpy as np
+
+SAMPLE_RATE = 16000
+TAPS_PER_OUTPUT_SAMPLE = 24  # with the default Kaiser window, aliases above 9 kHz come out ~80 dB down
+
+
+def design_filter(up, down, taps_per_phase=24, rolloff=0.9, beta=8.0):
+    """Kaiser-windowed sinc low-pass for an up/down rational resampler, split into up phases.
+
+    Returns an (up, taps_per_phase) array; row p holds the taps applied to
+    the input for output samples that land on phase p, already reversed so
+    a plain dot product with the oldest-first input window is the
+    convolution. The gain of every phase is up, undoing the zero stuffing.
+    """
+    length = up * taps_per_phase
+    cutoff = rolloff / max(up, down)  # fraction of the upsampled Nyquist
+    n = np.arange(length) - (length - 1) / 2
+    prototype = cutoff * np.sinc(cutoff * n) * np.kaiser(length, beta)
+    prototype *= up / prototype.sum()
+    return prototype.reshape(taps_per_phase, up).T[:, ::-1].copy()
+
+
+class PolyphaseResampler:
+    """Streaming rational resampler and downmix to mono for int16 capture blocks.
+
+    process() takes (frames, channels) or (frames,) int16 blocks of any
+    length and returns the int16 mono samples at out_rate they produce;
+    history carries across calls, so block boundaries are seamless. Every
+    output sample of a block is computed at once: a strided view gives
+    each one its input window and a single einsum applies the phase
+    filters, so the cost per second of audio does not depend on the
+    capture block size.
+    """
+
+    def __init__(self, in_rate, out_rate=SAMPLE_RATE, channels=1, taps_per_phase=None):
+        g = math.gcd(int(in_rate), int(out_rate))
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.up = int(out_rate) // g
+        self.down = int(in_rate) // g
+        if taps_per_phase is None:
+            # The transition band shrinks relative to the input rate as the ratio grows,
+            # so the filter has to span a fixed stretch of output time instead.
+            taps_per_phase = int(math.ceil(TAPS_PER_OUTPUT_SAMPLE * max(1.0, self.down / self.up)))
+        self.taps = taps_per_phase
+        self.filters = design_filter(self.up, self.down, taps_per_phase).astype(np.float32)
+        self._history = np.zeros(taps_per_phase - 1, dtype=np.float32)
+        self._position = 0  # upsampled index of the next output, relative to the start of the history window
+        self.passthrough = self.up == self.down
+
+    @property
+    def delay(self):
+        """Group delay of the filter in seconds; capture timestamps shift by this much."""
+        return 0.0 if self.passthrough else (self.taps - 1) / 2 / self.in_rate
+
+    def downmix(self, block):
+        if block.ndim == 1:
+            return block.astype(np.float32)
+        if block.shape[1] == 1:
+            return block[:, 0].astype(np.float32)
+        return block.mean(axis=1, dtype=np.float32)
+
+    def process(self, block):
+        if self.passthrough:
+            mono = block if block.ndim == 1 else block[:, 0] if block.shape[1] == 1 else self.downmix(block)
+            return np.asarray(mono).astype(np.int16, copy=False)
+        signal = np.concatenate((self._history, self.downmix(block)))
+        # Output m reads the window ending at input index (position + m*down) // up.
+        available = len(signal) - self.taps + 1
+        stop = available * self.up
+        positions = np.arange(self._position, stop, self.down)
+        windows = np.lib.stride_tricks.sliding_window_view(signal, self.taps)
+        out = np.einsum("mt,mt->m", windows[positions // self.up], self.filters[positions % self.up])
+        next_position = self._position + len(positions) * self.down
+        consumed = next_position // self.up
+        self._position = next_position - consumed * self.up
+        self._history = signal[consumed:]
+        return np.clip(np.rint(out), -32768, 32767).astype(np.int16)
+
+
+def benchmark(seconds=10, block_ms=30):
+    """CPU per second of audio for the rates capture devices usually run at."""
+    rng = np.random.default_rng(0)
+    print(f"{'input':>16}  {'taps':>4}  {'CPU ms per audio s':>18}  {'real time':>9}  {'out/in check':>12}")
+    for in_rate, channels in ((16000, 1), (32000, 1), (44100, 1), (44100, 2), (48000, 1), (48000, 2), (96000, 2)):
+        for taps in (None, 16):  # the automatic length, and a short filter for comparison
+            if taps is not None and in_rate == SAMPLE_RATE:
+                continue
+            resampler = PolyphaseResampler(in_rate, SAMPLE_RATE, channels, taps_per_phase=taps)
+            block = in_rate * block_ms // 1000
+            audio = (rng.normal(0, 3000, (in_rate * seconds, channels))).astype(np.int16)
+            produced = 0
+            started = time.perf_counter()
+            for i in range(0, len(audio), block):
+                produced += len(resampler.process(audio[i:i + block]))
+            cpu = time.perf_counter() - started
+            ms_per_second = cpu * 1000 / seconds
+            print(f"{in_rate:>9} Hz x{channels}  {'-' if resampler.passthrough else resampler.taps:>4}  {ms_per_second:>18.2f}  {ms_per_second / 10:>8.2f}%  "
+                  f"{produced / (seconds * SAMPLE_RATE):>12.4f}")
+
+
+def selftest():
+    """Tones below 7.2 kHz survive the trip to 16 kHz; ones above the new 8 kHz Nyquist are filtered out."""
+    for in_rate in (44100, 48000):
+        t = np.arange(in_rate * 2) / in_rate
+        for freq, label in ((1000, "passband"), (7000, "passband"), (9000, "stopband"), (12000, "stopband")):
+            tone = (10000 * np.sin(2 * np.pi * freq * t)).astype(np.int16)
+            stereo = np.stack((tone, tone), axis=1)
+            resampler = PolyphaseResampler(in_rate, SAMPLE_RATE, channels=2)
+            out = np.concatenate([resampler.process(stereo[i:i + 1323]) for i in range(0, len(stereo), 1323)])
+            rms = max(np.sqrt(np.mean(out[SAMPLE_RATE // 2:].astype(np.float64) ** 2)), 0.5)  # int16 rounding floor
+            print(f"{in_rate} Hz {label} {freq} Hz: {20 * np.log10(rms / (10000 / np.sqrt(2))):+6.1f} dB")
+
+
+if __name__ == "__main__":
+    import sys
+    if "--selftest" in sys.argv:
+        selftest()
+    else:
+        benchmark()
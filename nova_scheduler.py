@@ -0,0 +1,144 @@
+import asyncio
+import concurrent.futures
+import itertools
+import threading
+import time
+
+import nova_trace
+
+PRIORITY_REPLY = 0   # answers to the user
+PRIORITY_FACT = 10   # idle chatter; pre-empted by any reply
+
+
+class SpeechScheduler:
+    """Owns Nova's output side on one asyncio loop running in its own thread.
+
+    Utterances wait in a priority queue; a reply cancels an in-flight fact.
+    Blocking work (TTS, playback) runs on a small bounded executor and is
+    handed a threading.Event it should check to stop early. Idle chatter is
+    a single loop timer that is re-armed on activity, so nothing wakes up
+    while Nova is quiet.
+    """
+
+    def __init__(self, speak, idle_timeout=20, idle_cooldown=60, on_idle=None,
+                 echo_tail=0.5, max_workers=2):
+        self._speak = speak  # blocking speak(text, cancel_event)
+        self.idle_timeout = idle_timeout
+        self.idle_cooldown = idle_cooldown
+        self.on_idle = on_idle  # returns text to say when idle, or None
+        self.echo_tail = echo_tail
+        self.loop = asyncio.new_event_loop()
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="nova-io")
+        self.speaking = threading.Event()
+        self._queue = None
+        self._order = itertools.count()
+        self._current = None  # (priority, cancel event) of the utterance being spoken
+        self._idle_timer = None
+        self._last_idle_speech = float("-inf")
+        self._speech_started = float("inf")
+        self._speech_ended = float("-inf")
+        self._thread = None
+
+    # --- thread-safe API ---------------------------------------------------
+
+    def start(self):
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self._queue = asyncio.PriorityQueue()
+            self.loop.create_task(self._speaker())
+            self._arm_idle(self.idle_timeout)
+            self.loop.call_soon(ready.set)
+            self.loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        return self
+
+    def say(self, text, priority=PRIORITY_REPLY, trace=None):
+        """Queue text; trace ties the speech spans to the turn that asked for it."""
+        self.loop.call_soon_threadsafe(self._enqueue, priority, text, trace, time.perf_counter())
+
+    def cancel(self):
+        """Stop whatever is being said right now."""
+        self.loop.call_soon_threadsafe(self._cancel_current)
+
+    def activity(self):
+        """The user did something; push idle chatter back."""
+        self.loop.call_soon_threadsafe(self._arm_idle, self.idle_timeout)
+
+    def run_blocking(self, fn, *args):
+        """Run fn on the bounded executor; returns a concurrent.futures.Future."""
+        return self.executor.submit(fn, *args)
+
+    def queue_depth(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def overlaps_speech(self, started_at, ended_at):
+        """True if audio captured between two monotonic times may contain Nova's own voice."""
+        if self.speaking.is_set():
+            return True
+        return started_at <= self._speech_ended + self.echo_tail and ended_at >= self._speech_started
+
+    # --- loop side ---------------------------------------------------------
+
+    def _enqueue(self, priority, text, trace=None, queued_at=None):
+        if self._current is not None and priority < self._current[0]:
+            self._current[1].set()
+            nova_trace.incr("speech.preempted")
+        self._queue.put_nowait((priority, next(self._order), text, trace, queued_at or time.perf_counter()))
+        nova_trace.gauge("speech.queue_depth", self._queue.qsize())
+
+    def _cancel_current(self):
+        if self._current is not None:
+            self._current[1].set()
+
+    def _arm_idle(self, delay):
+        if self._idle_timer is not None:
+            self._idle_timer.cancel()
+        self._idle_timer = self.loop.call_later(delay, self._idle)
+
+    def _idle(self):
+        self._idle_timer = None
+        if self.on_idle is None or self.speaking.is_set() or self._queue.qsize():
+            return  # re-armed when the current speech finishes
+        wait = self._last_idle_speech + self.idle_cooldown - time.monotonic()
+        if wait > 0:
+            self._arm_idle(wait)
+            return
+        text = self.on_idle()
+        if text:
+            self._last_idle_speech = time.monotonic()
+            nova_trace.incr("speech.idle_facts")
+            self._enqueue(PRIORITY_FACT, text)
+
+    async def _speaker(self):
+        while True:
+            priority, _, text, trace, queued_at = await self._queue.get()
+            nova_trace.gauge("speech.queue_depth", self._queue.qsize())
+            waited = time.perf_counter() - queued_at
+            nova_trace.record("speech.queued", time.time() - waited, waited * 1000, trace)
+            cancel = threading.Event()
+            self._current = (priority, cancel)
+            if self._idle_timer is not None:
+                self._idle_timer.cancel()
+                self._idle_timer = None
+            self.speaking.set()
+            self._speech_started = time.monotonic()
+            try:
+                await self.loop.run_in_executor(self.executor, self._run_speech, text, cancel, priority, trace)
+            except Exception as e:
+                print("Speech error:", e)
+            finally:
+                self._speech_ended = time.monotonic()
+                self._current = None
+                self.speaking.clear()
+            if self._queue.empty():
+                self._arm_idle(self.idle_timeout)
+
+    def _run_speech(self, text, cancel, priority, trace):
+        with nova_trace.use(trace), nova_trace.span("speech", priority=priority):
+            self._speak(text, cancel)
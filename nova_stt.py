@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+
+import nova_audio
+
+VOSK_MODEL_DIR = "vosk-model"  # unpacked model from https://alphacephei.com/vosk/models
+
+
+class RecognitionSession:
+    """One utterance. feed() sees frames while the user is still talking; finish() gives the final text.
+
+    feed() returns the current partial hypothesis (or None if there is none
+    or it has not changed); finish() returns the transcript, or None when
+    nothing was understood. Service failures are raised.
+    """
+
+    def feed(self, frame):
+        return None
+
+    def finish(self, samples):
+        raise NotImplementedError
+
+
+class GoogleRecognizer:
+    """The Google Web Speech API via speech_recognition: the whole clip is uploaded once it ends."""
+
+    name = "google"
+    streaming = False
+
+    def __init__(self):
+        import speech_recognition as sr
+        self._sr = sr
+        # energy_threshold is left alone: speech_recognition only reads it in listen(), and
+        # utterances are cut by nova_audio's VAD, which follows the NoiseFloorModel itself.
+        self.recognizer = sr.Recognizer()
+
+    def start(self, sample_rate=nova_audio.SAMPLE_RATE):
+        return _GoogleSession(self, sample_rate)
+
+
+class _GoogleSession(RecognitionSession):
+    def __init__(self, backend, sample_rate):
+        self.backend = backend
+        self.sample_rate = sample_rate
+
+    def finish(self, samples):
+        audio = nova_audio.to_audio_data(samples, self.sample_rate)
+        try:
+            return self.backend.recognizer.recognize_google(audio)
+        except self.backend._sr.UnknownValueError:
+            return None
+
+
+class VoskRecognizer:
+    """Offline Kaldi recognizer on the CPU; decodes frame by frame and reports partial hypotheses."""
+
+    name = "vosk"
+    streaming = True
+    _models = {}
+    _models_lock = threading.Lock()
+
+    def __init__(self, model_dir=VOSK_MODEL_DIR):
+        import vosk
+        vosk.SetLogLevel(-1)
+        self._vosk = vosk
+        with self._models_lock:
+            # Loading a model takes seconds and hundreds of MB; share it between instances.
+            model = self._models.get(model_dir)
+            if model is None:
+                model = self._models[model_dir] = vosk.Model(model_dir)
+        self.model = model
+
+    def start(self, sample_rate=nova_audio.SAMPLE_RATE):
+        return _VoskSession(self._vosk.KaldiRecognizer(self.model, sample_rate))
+
+
+class _VoskSession(RecognitionSession):
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.fed = False
+        self.segments = []  # text of the pieces Kaldi has already finalized
+        self.partial = None
+
+    def _text(self, tail=""):
+        return " ".join(s for s in self.segments + [tail] if s)
+
+    def feed(self, frame):
+        self.fed = True
+        if self.recognizer.AcceptWaveform(frame.tobytes()):
+            self.segments.append(json.loads(self.recognizer.Result()).get("text", ""))
+            text = self._text()
+        else:
+            text = self._text(json.loads(self.recognizer.PartialResult()).get("partial", ""))
+        if not text or text == self.partial:
+            return None
+        self.partial = text
+        return text
+
+    def finish(self, samples):
+        if not self.fed:
+            self.recognizer.AcceptWaveform(samples.tobytes())
+        text = self._text(json.loads(self.recognizer.FinalResult()).get("text", ""))
+        return text or None
+
+
+class StubRecognizer:
+    """Deterministic stand-in for tests and benchmarks.
+
+    Utterances are answered with the given transcripts in turn. While
+    frames are fed, the transcript is revealed one word per
+    frames_per_word frames, so partial-result handling can be exercised
+    without a speech engine. finish() sleeps for latency seconds to stand
+    in for the final decode or network round trip.
+    """
+
+    name = "stub"
+    streaming = True
+
+    def __init__(self, transcripts=("hello nova",), frames_per_word=10, latency=0.0):
+        self.transcripts = list(transcripts)
+        self.frames_per_word = frames_per_word
+        self.latency = latency
+        self._turn = 0
+        self._lock = threading.Lock()
+
+    def start(self, sample_rate=nova_audio.SAMPLE_RATE):
+        with self._lock:
+            text = self.transcripts[self._turn % len(self.transcripts)] if self.transcripts else ""
+            self._turn += 1
+        return _StubSession(text.split(), self.frames_per_word, self.latency)
+
+
+class _StubSession(RecognitionSession):
+    def __init__(self, words, frames_per_word, latency):
+        self.words = words
+        self.frames_per_word = frames_per_word
+        self.latency = latency
+        self.frames = 0
+        self.shown = 0
+
+    def feed(self, frame):
+        self.frames += 1
+        shown = min(len(self.words), self.frames // self.frames_per_word)
+        if shown == self.shown:
+            return None
+        self.shown = shown
+        return " ".join(self.words[:shown])
+
+    def finish(self, samples):
+        if self.latency:
+            time.sleep(self.latency)
+        return " ".join(self.words) or None
+
+
+BACKENDS = {
+    "google": GoogleRecognizer,
+    "vosk": VoskRecognizer,
+    "stub": StubRecognizer,
+}
+
+
+def create_recognizer(name="auto", **options):
+    """Build a backend by name. "auto" prefers the offline engine when it and its model are installed."""
+    if name != "auto":
+        return BACKENDS[name](**options)
+    model_dir = options.pop("model_dir", VOSK_MODEL_DIR)
+    if os.path.isdir(model_dir):
+        try:
+            return VoskRecognizer(model_dir=model_dir)
+        except Exception as e:
+            print("Offline speech recognition unavailable, using Google:", e)
+    return GoogleRecognizer()
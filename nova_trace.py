@@ -0,0 +1,287 @@
+import bisect
+import collections
+import contextlib
+import http.server
+import json
+import os
+import queue
+import threading
+import time
+
+# Everything here is a no-op until configure(enabled=True); the checks are a
+# single global lookup so the calls can stay in the hot paths.
+ENABLED = False
+TRACE_FILE = "nova_trace.jsonl"
+
+# Upper bounds (ms) of the latency histogram buckets; the last one catches everything else.
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, float("inf"))
+
+_local = threading.local()
+_sink = None
+_server = None
+
+
+class Histogram:
+    """Fixed-bucket latency histogram: O(log buckets) to observe, no per-sample storage."""
+
+    def __init__(self, bounds=BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th sample (an over-estimate by at most one bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(self.bounds, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+    def snapshot(self):
+        return {"count": self.count, "sum_ms": round(self.total, 3),
+                "p50_ms": self.quantile(0.5), "p95_ms": self.quantile(0.95), "p99_ms": self.quantile(0.99)}
+
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = collections.Counter()
+        self.gauges = {}
+        self.histograms = collections.defaultdict(Histogram)
+
+    def incr(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def gauge(self, name, value):
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name, ms):
+        with self._lock:
+            self.histograms[name].observe(ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "gauges": dict(self.gauges),
+                    "histograms": {name: h.snapshot() for name, h in self.histograms.items()}}
+
+    def prometheus(self):
+        """The metrics in Prometheus text exposition format."""
+        def metric_name(name):
+            return "nova_" + "".join(c if c.isalnum() else "_" for c in name)
+
+        lines = []
+        with self._lock:
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE {metric_name(name)}_total counter", f"{metric_name(name)}_total {value}"]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {metric_name(name)} gauge", f"{metric_name(name)} {value}"]
+            for name, h in sorted(self.histograms.items()):
+                base = metric_name(name) + "_ms"
+                lines.append(f"# TYPE {base} histogram")
+                cumulative = 0
+                for bound, n in zip(h.bounds, h.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'{base}_bucket{{le="{le}"}} {cumulative}')
+                lines += [f"{base}_sum {h.total}", f"{base}_count {h.count}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+class RotatingJsonlSink:
+    """Span records written off the calling thread to a size-rotated JSONL file.
+
+    A metrics snapshot is appended every snapshot_interval seconds so the
+    file alone is enough to chart counters over time.
+    """
+
+    def __init__(self, path=TRACE_FILE, max_bytes=5 * 1024 * 1024, backups=3, snapshot_interval=60):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.snapshot_interval = snapshot_interval
+        self._queue = queue.SimpleQueue()
+        self._file = open(path, "a", encoding="utf-8")
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def write(self, record):
+        self._queue.put(record)
+
+    def _rotate(self):
+        self._file.close()
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        self._file = open(self.path, "w", encoding="utf-8")
+
+    def _run(self):
+        next_snapshot = time.monotonic() + self.snapshot_interval
+        while True:
+            try:
+                batch = [self._queue.get(timeout=max(0.0, next_snapshot - time.monotonic()))]
+                while len(batch) < 256:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+            except queue.Empty:
+                batch = []
+            if time.monotonic() >= next_snapshot:
+                batch.append({"ts": time.time(), "metrics": metrics.snapshot()})
+                next_snapshot = time.monotonic() + self.snapshot_interval
+            try:
+                self._file.write("".join(json.dumps(r, default=str) + "\n" for r in batch))
+                self._file.flush()
+                if self._file.tell() >= self.max_bytes:
+                    self._rotate()
+            except Exception as e:
+                print("Trace write failed:", e)
+
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+class Span:
+    def __init__(self, name, trace, attrs):
+        self.name = name
+        self.trace = trace
+        self.attrs = attrs
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self):
+        self.ts = time.time()
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        ms = (time.perf_counter() - self._started) * 1000
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        _finish(self.name, self.trace, self.ts, ms, self.attrs)
+        return False
+
+
+def _finish(name, trace, ts, ms, attrs):
+    metrics.observe(name, ms)
+    if _sink is not None:
+        record = {"ts": round(ts, 6), "trace": trace, "span": name, "ms": round(ms, 3),
+                  "thread": threading.current_thread().name}
+        record.update(attrs)
+        _sink.write(record)
+
+
+def new_trace_id():
+    return os.urandom(8).hex()
+
+
+def current():
+    """Trace ID of the turn this thread is working on, or None."""
+    return getattr(_local, "trace", None)
+
+
+@contextlib.contextmanager
+def use(trace):
+    """Make trace the current one on this thread for the block (hands a turn to another thread)."""
+    previous = getattr(_local, "trace", None)
+    _local.trace = trace
+    try:
+        yield trace
+    finally:
+        _local.trace = previous
+
+
+def turn():
+    """Start a new trace for one conversational turn on this thread."""
+    return use(new_trace_id() if ENABLED else None)
+
+
+def span(name, **attrs):
+    """Time a block as a span of the current turn."""
+    if not ENABLED:
+        return _NOOP
+    return Span(name, current(), attrs)
+
+
+def record(name, started, ms, trace=None, **attrs):
+    """A span measured elsewhere: started is a wall-clock time.time(), ms its duration."""
+    if ENABLED:
+        _finish(name, trace or current(), started, ms, attrs)
+
+
+def incr(name, n=1):
+    if ENABLED:
+        metrics.incr(name, n)
+
+
+def gauge(name, value):
+    if ENABLED:
+        metrics.gauge(name, value)
+
+
+class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body, kind = metrics.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+        elif self.path == "/metrics.json":
+            body, kind = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", kind)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # scrapes every few seconds would drown the console
+
+
+def serve_metrics(port, host="127.0.0.1"):
+    """Expose /metrics (Prometheus) and /metrics.json on a local port from a daemon thread."""
+    global _server
+    _server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+    _server.daemon_threads = True
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    print(f"📈 Metrics at http://{host}:{_server.server_port}/metrics")
+    return _server
+
+
+def configure(enabled=True, path=TRACE_FILE, http_port=None, **sink_options):
+    global ENABLED, _sink
+    ENABLED = enabled
+    if enabled and path and _sink is None:
+        _sink = RotatingJsonlSink(path, **sink_options)
+    if enabled and http_port is not None and _server is None:
+        serve_metrics(http_port)
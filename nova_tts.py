@@ -0,0 +1,330 @@
+import collections
+import hashlib
+import json
+import os
+import queue
+import re
+import threading
+import time
+
+import numpy as np
+
+import nova_audio
+import nova_trace
+
+VOICE_NAME = "en-US-Wavenet-F"
+LANGUAGE_CODE = "en-AU"
+SAMPLE_RATE = 16000
+PROSODY = {"rate": "medium", "pitch": "-5st"}
+CACHE_DIR = "tts_cache"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_DONE = object()
+
+
+def build_ssml(text, prosody=PROSODY):
+    # Use SSML to adjust prosody for a more natural output.
+    attrs = " ".join(f"{k}='{v}'" for k, v in sorted(prosody.items()))
+    return f"<speak><prosody {attrs}>{text}</prosody></speak>"
+
+
+def split_sentences(text):
+    """Split at sentence-final punctuation so each piece can be synthesized on its own."""
+    return [s for s in (part.strip() for part in _SENTENCE_END.split(text)) if s]
+
+
+class TTSCache:
+    """Content-addressed PCM cache: an in-memory LRU in front of a size-capped directory."""
+
+    def __init__(self, cache_dir=CACHE_DIR, memory_bytes=8 * 1024 * 1024, disk_bytes=64 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._memory = collections.OrderedDict()
+        self._memory_used = 0
+        self._disk = collections.OrderedDict()  # key -> size, oldest first
+        self._disk_used = 0
+        self._lock = threading.Lock()
+        self.stats = collections.Counter()
+        self._scan_disk()
+
+    @staticmethod
+    def key(ssml, voice_name, language_code, sample_rate, prosody):
+        blob = json.dumps([ssml, voice_name, language_code, sample_rate, prosody], sort_keys=True)
+        return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".pcm")
+
+    def _scan_disk(self):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.is_file() and entry.name.endswith(".pcm"):
+                st = entry.stat()
+                entries.append((st.st_mtime, entry.name[:-4], st.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+
+    def get(self, key):
+        with self._lock:
+            pcm = self._memory.get(key)
+            if pcm is not None:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return pcm
+            on_disk = key in self._disk
+        if on_disk:
+            try:
+                with open(self._path(key), "rb") as f:
+                    pcm = f.read()
+                nova_audio.io_stats["disk_reads"] += 1
+            except OSError:
+                pcm = None
+            if pcm is not None:
+                with self._lock:
+                    self.stats["disk_hits"] += 1
+                    self._disk.move_to_end(key, last=True)
+                    self._remember(key, pcm)
+                return pcm
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def put(self, key, pcm):
+        with self._lock:
+            self._remember(key, pcm)
+        if not self.cache_dir or len(pcm) > self.disk_bytes:
+            return
+        tmp_path = self._path(key) + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(pcm)
+            os.replace(tmp_path, self._path(key))
+            nova_audio.io_stats["disk_writes"] += 1
+        except OSError as e:
+            print("TTS cache write failed:", e)
+            return
+        with self._lock:
+            self._disk_used += len(pcm) - self._disk.pop(key, 0)
+            self._disk[key] = len(pcm)
+            while self._disk_used > self.disk_bytes and len(self._disk) > 1:
+                old_key, size = self._disk.popitem(last=False)
+                self._disk_used -= size
+                self.stats["disk_evictions"] += 1
+                try:
+                    os.remove(self._path(old_key))
+                except OSError:
+                    pass
+
+    def _remember(self, key, pcm):
+        # Caller holds the lock.
+        if len(pcm) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        self._memory[key] = pcm
+        self._memory_used += len(pcm)
+        while self._memory_used > self.memory_bytes:
+            _, old = self._memory.popitem(last=False)
+            self._memory_used -= len(old)
+            self.stats["memory_evictions"] += 1
+
+    def summary(self):
+        with self._lock:
+            return dict(self.stats, memory_bytes=self._memory_used, disk_bytes=self._disk_used)
+
+
+class GoogleSynthesizer:
+    """Google Cloud TTS through one long-lived client shared by every thread."""
+
+    name = "google"
+    cacheable = True
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        with self._lock:
+            if self._client is None:
+                from google.cloud import texttospeech
+                self._client = texttospeech.TextToSpeechClient()
+            return self._client
+
+    def synthesize_ssml(self, ssml, voice_name, language_code, sample_rate):
+        from google.cloud import texttospeech
+        synthesis_input = texttospeech.SynthesisInput(ssml=ssml)
+        voice = texttospeech.VoiceSelectionParams(language_code=language_code, name=voice_name)
+        audio_config = texttospeech.AudioConfig(
+            audio_encoding=texttospeech.AudioEncoding.LINEAR16,
+            sample_rate_hertz=sample_rate
+        )
+        response = self.client().synthesize_speech(
+            input=synthesis_input, voice=voice, audio_config=audio_config
+        )
+        pcm, _, _, _ = nova_audio.split_wav_bytes(response.audio_content)
+        return pcm
+
+
+class StubSynthesizer:
+    """Offline stand-in: a quiet tone whose length tracks the text, after a simulated delay."""
+
+    name = "stub"
+    cacheable = False
+
+    def __init__(self, latency=0.15, latency_per_char=0.004, chars_per_second=15.0):
+        self.latency = latency
+        self.latency_per_char = latency_per_char
+        self.chars_per_second = chars_per_second
+
+    def synthesize_ssml(self, ssml, voice_name, language_code, sample_rate):
+        text = re.sub(r"<[^>]+>", "", ssml)
+        time.sleep(self.latency + self.latency_per_char * len(text))
+        n = int(sample_rate * max(len(text), 1) / self.chars_per_second)
+        t = np.arange(n, dtype=np.float32) / sample_rate
+        return (1000 * np.sin(2 * np.pi * 220 * t)).astype(np.int16).tobytes()
+
+
+cache = None  # built by get_cache() on first use, so importing never creates CACHE_DIR
+_cache_lock = threading.Lock()
+backend = GoogleSynthesizer()
+
+
+def get_cache():
+    global cache
+    with _cache_lock:
+        if cache is None:
+            cache = TTSCache()
+        return cache
+
+
+def synthesize(text, voice_name=VOICE_NAME, language_code=LANGUAGE_CODE,
+               sample_rate=SAMPLE_RATE, prosody=PROSODY, synthesizer=None):
+    """Return mono 16-bit PCM for text, from the cache when the same speech was made before."""
+    synthesizer = synthesizer or backend
+    ssml_text = build_ssml(text, prosody)
+    key = None
+    if synthesizer.cacheable:
+        key = TTSCache.key(ssml_text, voice_name, language_code, sample_rate, prosody)
+        pcm = get_cache().get(key)
+        if pcm is not None:
+            nova_trace.incr("tts.cache_hits")
+            return pcm
+        nova_trace.incr("tts.cache_misses")
+    with nova_trace.span("tts.synthesize", backend=synthesizer.name, chars=len(text)):
+        pcm = synthesizer.synthesize_ssml(ssml_text, voice_name, language_code, sample_rate)
+    if key is not None:
+        get_cache().put(key, pcm)
+    return pcm
+
+
+def _play_and_wait(pcm, sample_rate, cancel=None):
+    play_obj = nova_audio.play_pcm(pcm, sample_rate=sample_rate)
+    # Sleep on the cancel event for the length of the clip rather than polling the player.
+    if cancel is not None and cancel.wait(len(pcm) / 2 / sample_rate):
+        play_obj.stop()
+        nova_audio.playback_stopped()
+    else:
+        play_obj.wait_done()
+
+
+def speak_pipelined(text, play=None, synthesizer=None, on_play=None, cancel=None, **voice_options):
+    """Synthesize sentence N+1 while sentence N is playing.
+
+    play(pcm, sample_rate) must block until the audio has finished;
+    on_play(pcm, sample_rate) is called just before each sentence starts.
+    Setting the cancel event stops playback (mid-sentence with the default
+    player) and abandons the sentences not yet synthesized.
+    Returns timing stats; time_to_first_audio only depends on the first sentence.
+    """
+    sentences = split_sentences(text) or [text]
+    sample_rate = voice_options.get("sample_rate", SAMPLE_RATE)
+    cancel = cancel or threading.Event()
+    play = play or (lambda pcm, rate: _play_and_wait(pcm, rate, cancel))
+    ready = queue.Queue(maxsize=2)
+    trace = nova_trace.current()
+
+    def produce():
+        with nova_trace.use(trace):
+            produce_sentences()
+
+    def produce_sentences():
+        for sentence in sentences:
+            if cancel.is_set():
+                break  # still post _DONE, the consumer may be waiting on get()
+            try:
+                ready.put(synthesize(sentence, synthesizer=synthesizer, **voice_options))
+            except Exception as e:
+                print("TTS synthesis error:", e)
+                nova_trace.incr("tts.errors")
+        ready.put(_DONE)
+
+    started = time.perf_counter()
+    threading.Thread(target=produce, daemon=True).start()
+    first_audio = None
+    try:
+        while not cancel.is_set():
+            pcm = ready.get()
+            # Cancelled while this sentence was being synthesized: it must not start at all.
+            if pcm is _DONE or cancel.is_set():
+                break
+            if first_audio is None:
+                first_audio = time.perf_counter() - started
+                nova_trace.record("tts.first_audio", time.time() - first_audio, first_audio * 1000)
+            if on_play is not None:
+                on_play(pcm, sample_rate)
+            with nova_trace.span("playback", audio_ms=round(len(pcm) / 2 / sample_rate * 1000)):
+                play(pcm, sample_rate)
+        cancelled = cancel.is_set()
+    finally:
+        # However this ends (a player that raises included), stop the producer and unblock it
+        # if it is waiting on a full queue; it sees the event and stops.
+        cancel.set()
+        while not ready.empty():
+            ready.get_nowait()
+    if cancelled:
+        nova_trace.incr("speech.cancelled")
+    return {"sentences": len(sentences),
+            "time_to_first_audio": first_audio,
+            "total": time.perf_counter() - started,
+            "cancelled": cancelled}
+
+
+def prewarm(phrases, **voice_options):
+    """Synthesize any uncached phrases on a background thread."""
+    def run():
+        for phrase in phrases:
+            # speak_pipelined() looks sentences up one at a time, so cache them that way.
+            for sentence in split_sentences(phrase) or [phrase]:
+                try:
+                    synthesize(sentence, **voice_options)
+                except Exception as e:
+                    print("TTS prewarm failed for", repr(sentence), "-", e)
+        print("TTS cache prewarmed:", get_cache().summary())
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == "__main__":
+    # Offline check of the pipelining with the stand-in backend and a sleep-based player.
+    reply = ("Here's something freaky from the digital jungle. Chimpanzees can use tools. "
+             "They crack nuts with stones! Some even fish for termites with sticks.")
+    stub = StubSynthesizer(latency=0.2, latency_per_char=0.01, chars_per_second=40.0)
+
+    def fake_play(pcm, sample_rate):
+        time.sleep(len(pcm) / 2 / sample_rate)
+
+    serial_start = time.perf_counter()
+    whole = synthesize(reply, synthesizer=stub)
+    serial_first = time.perf_counter() - serial_start
+    fake_play(whole, SAMPLE_RATE)
+    print("whole reply: first audio after {:.2f}s, done after {:.2f}s".format(
+        serial_first, time.perf_counter() - serial_start))
+    stats = speak_pipelined(reply, play=fake_play, synthesizer=stub)
+    print("pipelined:   first audio after {time_to_first_audio:.2f}s, done after {total:.2f}s "
+          "({sentences} sentences)".format(**stats))